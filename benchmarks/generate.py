@@ -0,0 +1,193 @@
+"""
+Deterministic synthetic data for the dashboard, with the schemas of the real
+exports, for benchmarking without the LFS data files.
+
+    python benchmarks/generate.py --scale 10
+
+writes realestate_developers.parquet, cla-realestate.parquet,
+realestate_google_trends.parquet and their -min trajectory subsets to
+benchmarks/data/10x. The same seed and scale always give the same files.
+Run the dashboard from that directory to use them.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from faker import Faker
+
+
+# Rows of each export at scale 1
+DEVELOPER_ROWS = 20_000
+CONSUMER_ROWS = 100_000
+TRENDS_ROWS = 50_000
+
+# Names drawn from by every scale; consumer accounts grow with the rows
+THEMES = 12
+KEYWORDS = 800
+BRANDS = 300
+ACCOUNT_NAMES = 2_000
+CONSUMER_ROWS_PER_ACCOUNT = 4
+
+# Country spellings as they occur in the exports, normalized by the trajectory page
+COUNTRIES = ['uae', 'United Arab Emirates', 'uk', 'United Kingdom', 'egy', 'Egypt', 'ksa',
+             'Saudi Arabia', 'aus', 'Australia', 'sg', 'Singapore', None]
+
+FIRST_DAY = pd.Timestamp('2019-01-01')
+DAYS = 7 * 365
+
+# Rows generated and written at a time, which bounds memory at large scales
+CHUNK_ROWS = 1_000_000
+
+DEVELOPER_SCHEMA = pa.schema([
+    ('username', pa.string()),
+    ('theme', pa.string()),
+    ('matched_keyword', pa.string()),
+    ('country', pa.string()),
+    # The developer export stores upload times as ISO text, the consumer export as timestamps
+    ('post_upload_date', pa.string()),
+    ('post_likes', pa.int64()),
+    ('post_video_view_count', pa.float64()),
+    ('post_comments', pa.int64()),
+    ('followers', pa.float64()),
+])
+CONSUMER_SCHEMA = pa.schema([
+    ('username', pa.string()),
+    ('matched_theme', pa.string()),
+    ('matched_keyword', pa.string()),
+    ('country', pa.string()),
+    ('post_upload_date', pa.timestamp('us')),
+    ('post_likes', pa.int64()),
+    ('post_video_view_count', pa.float64()),
+    ('post_comments', pa.int64()),
+])
+TRENDS_SCHEMA = pa.schema([
+    ('theme', pa.string()),
+    ('keyword', pa.string()),
+    ('country', pa.string()),
+    ('date', pa.timestamp('us')),
+    ('value', pa.int64()),
+])
+
+# The -min files read by the trajectory page: its columns of each export
+MIN_COLUMNS = {
+    'realestate_developers.parquet': ['theme', 'matched_keyword', 'country', 'post_upload_date'],
+    'cla-realestate.parquet': ['matched_theme', 'matched_keyword', 'country', 'post_upload_date'],
+    'realestate_google_trends.parquet': ['theme', 'keyword', 'country', 'date', 'value'],
+}
+
+
+def vocabulary(seed, consumer_accounts):
+    """Theme, keyword and account names from a seeded Faker, with each keyword's theme."""
+    fake = Faker()
+    fake.seed_instance(seed)
+    themes = [f"{fake.unique.word().title()} Living" for _ in range(THEMES)]
+    keywords = [f"{fake.unique.word()} {fake.word()}" for _ in range(KEYWORDS)]
+    brands = [fake.unique.company() for _ in range(BRANDS)]
+    # Account names are numbered variants of a fixed pool, which keeps Faker off the per-row path
+    pool = [fake.user_name() for _ in range(ACCOUNT_NAMES)]
+    accounts = [f"{pool[i % ACCOUNT_NAMES]}{i // ACCOUNT_NAMES}" for i in range(consumer_accounts)]
+    return {
+        'themes': np.array(themes, dtype=object),
+        'keywords': np.array(keywords, dtype=object),
+        'keyword_theme': np.arange(KEYWORDS) % THEMES,
+        'brands': np.array(brands, dtype=object),
+        'accounts': np.array(accounts, dtype=object),
+        'countries': np.array(COUNTRIES, dtype=object),
+    }
+
+
+def popularity(size, skew=1.1):
+    """Zipf-like draw probabilities, so a few names dominate as in the real data."""
+    weights = 1 / np.arange(1, size + 1) ** skew
+    return weights / weights.sum()
+
+
+def upload_times(rng, n):
+    """Upload times spread over DAYS days, busier towards the end."""
+    days = np.floor(DAYS * np.sqrt(rng.random(n))).astype('int64')
+    seconds = rng.integers(0, 86_400, n)
+    return FIRST_DAY + pd.to_timedelta(days, unit='D') + pd.to_timedelta(seconds, unit='s')
+
+
+def posts_chunk(rng, names, n, theme_column, users, with_followers, text_dates):
+    keyword = rng.choice(KEYWORDS, n, p=popularity(KEYWORDS))
+    views = rng.lognormal(7, 2, n).round()
+    views[rng.random(n) < 0.4] = np.nan
+    columns = {
+        'username': users[rng.choice(len(users), n, p=popularity(len(users), 0.8))],
+        theme_column: names['themes'][names['keyword_theme'][keyword]],
+        'matched_keyword': names['keywords'][keyword],
+        'country': names['countries'][rng.integers(0, len(COUNTRIES), n)],
+        'post_upload_date': upload_times(rng, n),
+        'post_likes': rng.geometric(1 / 200, n).astype('int64'),
+        'post_video_view_count': views,
+        'post_comments': rng.geometric(1 / 15, n).astype('int64') - 1,
+    }
+    if text_dates:
+        columns['post_upload_date'] = np.datetime_as_string(columns['post_upload_date'].to_numpy(), unit='s')
+    if with_followers:
+        followers = rng.lognormal(10, 2, n).round()
+        followers[rng.random(n) < 0.05] = np.nan
+        columns['followers'] = followers
+    return pd.DataFrame(columns)
+
+
+def trends_chunk(rng, names, n):
+    keyword = rng.choice(KEYWORDS, n, p=popularity(KEYWORDS))
+    day = rng.integers(0, DAYS, n)
+    # Interest follows a per-keyword trend plus noise, clipped to Google's 0-100
+    trend = (keyword % 7 - 3) / DAYS * 30
+    value = 40 + trend * day + rng.normal(0, 15, n)
+    return pd.DataFrame({
+        'theme': names['themes'][names['keyword_theme'][keyword]],
+        'keyword': names['keywords'][keyword],
+        'country': names['countries'][rng.integers(0, len(COUNTRIES) - 1, n)],
+        'date': FIRST_DAY + pd.to_timedelta(day, unit='D'),
+        'value': np.clip(value.round(), 0, 100).astype('int64'),
+    })
+
+
+def write(path, schema, rows, make_chunk):
+    """Writes make_chunk(n) frames of CHUNK_ROWS rows at most to `path`, one row group each."""
+    with pq.ParquetWriter(path, schema) as writer:
+        for start in range(0, rows, CHUNK_ROWS):
+            frame = make_chunk(min(CHUNK_ROWS, rows - start))
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+
+
+def generate(output, scale=1, seed=0):
+    """Writes the three exports and their -min subsets at `scale` times the base row counts to `output`."""
+    os.makedirs(output, exist_ok=True)
+    consumer_rows = int(CONSUMER_ROWS * scale)
+    names = vocabulary(seed, max(consumer_rows // CONSUMER_ROWS_PER_ACCOUNT, 1))
+    # One generator per file, so each file depends only on the seed and its own size
+    rngs = [np.random.default_rng([seed, i]) for i in range(3)]
+
+    write(os.path.join(output, 'realestate_developers.parquet'), DEVELOPER_SCHEMA, int(DEVELOPER_ROWS * scale),
+          lambda n: posts_chunk(rngs[0], names, n, 'theme', names['brands'], True, True))
+    write(os.path.join(output, 'cla-realestate.parquet'), CONSUMER_SCHEMA, consumer_rows,
+          lambda n: posts_chunk(rngs[1], names, n, 'matched_theme', names['accounts'], False, False))
+    write(os.path.join(output, 'realestate_google_trends.parquet'), TRENDS_SCHEMA, int(TRENDS_ROWS * scale),
+          lambda n: trends_chunk(rngs[2], names, n))
+
+    for path, columns in MIN_COLUMNS.items():
+        table = pq.read_table(os.path.join(output, path), columns=columns)
+        pq.write_table(table, os.path.join(output, path.replace('.parquet', '-min.parquet')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1, help='multiple of the base row counts, e.g. 1, 10 or 100')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='directory to write to (default: benchmarks/data/<scale>x)')
+    args = parser.parse_args()
+    output = args.output or os.path.join(os.path.dirname(__file__), 'data', f'{args.scale:g}x')
+    generate(output, args.scale, args.seed)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
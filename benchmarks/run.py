@@ -0,0 +1,223 @@
+"""
+Micro-benchmarks of the dashboard's data functions on the parquet files of
+a data directory, such as one written by generate.py:
+
+    python benchmarks/generate.py --scale 10
+    python benchmarks/run.py --data benchmarks/data/10x --output before.json
+    python benchmarks/run.py --data benchmarks/data/10x --compare before.json
+
+Every public function of bla_data and consumer_data is timed on the
+page's full rollup (page_results once per section), as are load_data cold,
+the trajectory path (load_sources, prepare_data, classify_themes,
+resample_volumes, load_trajectories) and the Search Trends aggregate_values
+and page_results.
+Each benchmark is called once to warm up, then `--repeat` times; the
+timings and the row counts of the data files are written as JSON.
+"""
+import argparse
+import contextlib
+import inspect
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import polars as pl
+import pyarrow.parquet as pq
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import bla_data  # noqa: E402
+import consumer_data  # noqa: E402
+import dataset  # noqa: E402
+import trajectory_analysis  # noqa: E402
+import trends_data  # noqa: E402
+
+
+DATA_FILES = [
+    bla_data.DATA_PATH, consumer_data.DATA_PATH, trends_data.DATA_PATH,
+    trajectory_analysis.DEVELOPER_PATH, trajectory_analysis.CONSUMER_PATH, trajectory_analysis.TREND_PATH,
+]
+
+
+def cold():
+    """Drops every load_once result, so the next load reads and builds from the files again."""
+    with dataset._loaded_lock:
+        dataset._loaded.clear()
+
+
+def page_benchmarks(module):
+    """(name, setup, call) of every public function of a page data module, with its arguments."""
+    data = module.load_data()
+    rollup, posts = data['rollup'], data['posts']
+    arguments = {
+        'format_number': (1_234_567,),
+        'estimate_post_reach_row': (posts.iloc[0].to_dict(),),
+    }
+    if module is consumer_data:
+        # Distinct accounts are counted on the posts, which keep the username
+        arguments['get_total_unique_accounts'] = (posts,)
+
+    benchmarks = []
+    for name, func in inspect.getmembers(module, inspect.isfunction):
+        if name.startswith('_') or func.__module__ != module.__name__:
+            continue
+        prefix = f"{module.__name__}.{name}"
+        if name == 'load_data':
+            benchmarks.append((prefix, cold, func))
+        elif name == 'page_results':
+            # consumer_data's also takes the posts, for the distinct account KPI
+            args = (rollup, posts) if module is consumer_data else (rollup,)
+            for section in [None] + module.SECTIONS:
+                call = (lambda func, args, section: lambda: func(*args, section=section))(func, args, section)
+                benchmarks.append((f"{prefix}[{section or 'KPIs'}]", None, call))
+        else:
+            args = arguments.get(name, (rollup,))
+            benchmarks.append((prefix, None, (lambda func, args: lambda: func(*args))(func, args)))
+    return benchmarks
+
+
+def trajectory_benchmarks():
+    """(name, setup, call) of the Trajectory Analysis data path, for both grouping levels."""
+    module = trajectory_analysis
+    sources = module.load_sources()
+    benchmarks = [
+        ('trajectory_analysis.load_sources', cold, module.load_sources),
+        ('trajectory_analysis.load_trajectories', cold, module.load_trajectories),
+    ]
+    for use_sub_theme in (False, True):
+        level = 'sub_theme' if use_sub_theme else 'theme'
+        for by_country in (False, True):
+            name = f"trajectory_analysis.prepare_data[{level}{', by_country' if by_country else ''}]"
+            call = (lambda u, b: lambda: module.prepare_data(sources, use_sub_theme=u, by_country=b))(
+                use_sub_theme, by_country
+            )
+            benchmarks.append((name, None, call))
+        avg_volume, group_keys = module.prepare_data(sources, use_sub_theme=use_sub_theme)
+        benchmarks.append((
+            f"trajectory_analysis.classify_themes[{level}]", None,
+            (lambda a, g: lambda: module.classify_themes(a, g))(avg_volume, group_keys),
+        ))
+        benchmarks.append((
+            f"trajectory_analysis.resample_volumes[{level}]", None,
+            (lambda a, k: lambda: module.resample_volumes(a, k))(avg_volume, group_keys[-1]),
+        ))
+    return benchmarks
+
+
+def trends_benchmarks():
+    """(name, setup, call) of the Search Trends page data functions."""
+    df = trends_data.load_data()['trends']
+    sums = trends_data.aggregate_values(df)
+    benchmarks = [
+        ('trends_data.load_data', cold, trends_data.load_data),
+        ('trends_data.aggregate_values', None, lambda: trends_data.aggregate_values(df)),
+    ]
+    for section in trends_data.SECTIONS:
+        call = (lambda section: lambda: trends_data.page_results(sums, section))(section)
+        benchmarks.append((f"trends_data.page_results[{section}]", None, call))
+    return benchmarks
+
+
+def measure(setup, call, repeat):
+    """Seconds of `repeat` calls after one warm-up call, setup (if any) run untimed before each."""
+    times = []
+    for i in range(repeat + 1):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        call()
+        if i:
+            times.append(time.perf_counter() - start)
+    return times
+
+
+def summary(times):
+    return {
+        'runs': len(times),
+        'min_seconds': min(times),
+        'median_seconds': statistics.median(times),
+        'mean_seconds': statistics.fmean(times),
+        'max_seconds': max(times),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(data_dir, repeat):
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'data': os.path.abspath(data_dir),
+        'rows': {path: pq.ParquetFile(path).metadata.num_rows for path in DATA_FILES},
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'polars': pl.__version__,
+    }
+
+
+def report(results, baseline=None):
+    """Prints the median of every benchmark, with its ratio to the baseline's median when given."""
+    width = max(len(name) for name in results)
+    for name, result in results.items():
+        line = f"{name:<{width}}  {result['median_seconds'] * 1000:10.2f} ms"
+        if baseline and name in baseline:
+            line += f"  {result['median_seconds'] / baseline[name]['median_seconds']:6.2f}x"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', required=True, help='directory with the parquet files')
+    parser.add_argument('--repeat', type=int, default=5, help='timed calls per benchmark')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('--output', help='JSON file to write the results to')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+
+    # The modules read their files by relative path, as the app does from the repo root
+    os.chdir(args.data)
+    benchmarks = (
+        page_benchmarks(bla_data) + page_benchmarks(consumer_data) + trajectory_benchmarks() + trends_benchmarks()
+    )
+
+    results = {}
+    for name, setup, call in benchmarks:
+        if args.filter not in name:
+            continue
+        # Some of the functions print; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = summary(measure(setup, call, args.repeat))
+    report(results, baseline)
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'meta': metadata('.', args.repeat), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,46 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from growth import fastest_growing_groups, top_growth_per_year
+from colors import register_names
+from dataset import load_posts, load_once, date_slice, daily_sum
+from filter_index import build_filter_index
+from rollup import build_rollup, total_by
+
+
+# Columns used by the Brand Led Analysis page
+COLUMNS = [
+    'username', 'theme', 'matched_keyword', 'country', 'post_upload_date',
+    'post_likes', 'post_video_view_count', 'post_comments', 'followers',
+]
+
+DATA_PATH = "realestate_developers.parquet"
+
+# The page filters and charts run on the daily rollup of the posts
+DIMENSIONS = ['theme', 'matched_keyword', 'country', 'username']
+
+# Chart sections of the page, in navigation order; each is computed only when shown
+SECTIONS = ['Overall', 'Theme', 'Sub Theme']
+
+
+def _build_data(path, version):
+    df = load_posts(path, columns=COLUMNS)
+    register_names('theme', df['theme'].cat.categories)
+    register_names('keyword', df['matched_keyword'].cat.categories)
+    register_names('brand', df['username'].cat.categories)
+    rollup = build_rollup(df, DIMENSIONS)
+    return {
+        'version': version,
+        'posts': df,
+        'rollup': rollup,
+        'rollup_index': build_filter_index(rollup, DIMENSIONS),
+    }
 
 
 # Load data
-df = pd.read_parquet("realestate_developers.parquet")
+def load_data():
+    """The page's posts, rollup and filter index, loaded when the page is first opened."""
+    return load_once(DATA_PATH, _build_data)
 
 
 # Utility to format large numbers
@@ -20,15 +56,15 @@ def format_number(num):
 
 def get_top_10_accounts_by_volume(df):
     return (
-        df.groupby("username")
-        .size()
-        .reset_index(name="post_count")
+        df.groupby("username", observed=True)["post_count"]
+        .sum()
+        .reset_index()
         .sort_values(by="post_count", ascending=False)
         .head(10)
     )
 
 def get_total_volume(df):
-    return format_number(len(df))
+    return format_number(df['post_count'].sum())
 
 
 def get_total_countries(df):
@@ -36,9 +72,7 @@ def get_total_countries(df):
 
 
 def get_total_engagement(df):
-    return format_number(
-        (df['post_likes'] + df['post_video_view_count'] + df['post_comments']).sum()
-    )
+    return format_number(df['engagement'].sum())
 
 
 def get_total_unique_accounts(df):
@@ -54,70 +88,78 @@ def estimate_post_reach_row(row):
     return (0.1 * followers) + (0.05 * engagement)
 
 
+def _reach_component(df, column):
+    # Missing columns and nulls count as 0, like the `or 0` in estimate_post_reach_row
+    if column not in df:
+        return np.zeros(len(df))
+    return df[column].to_numpy(dtype='float64', na_value=0)
+
+
+def estimate_reach(df):
+    """Column-wise version of estimate_post_reach_row for a whole frame."""
+    if 'engagement' in df:
+        engagement = _reach_component(df, 'engagement')
+    else:
+        engagement = (
+            _reach_component(df, 'post_likes')
+            + _reach_component(df, 'post_comments')
+            + _reach_component(df, 'post_video_view_count')
+        )
+    reach = (0.1 * _reach_component(df, 'followers')) + (0.05 * engagement)
+    return pd.Series(reach, index=df.index, name='estimated_reach')
+
+
 def get_total_estimated_reach(df):
-    df = df.copy()
-    df['estimated_reach'] = df.apply(estimate_post_reach_row, axis=1)
-    return format_number(df['estimated_reach'].sum())
+    return format_number(estimate_reach(df).sum())
+
+
+def get_reach_by_brand(df):
+    reach = estimate_reach(df)
+    return (
+        reach.groupby(df['username'], observed=True)
+        .sum()
+        .reset_index(name='estimated_reach')
+        .sort_values(by='estimated_reach', ascending=False)
+    )
+
+
+def get_reach_by_day(df):
+    return daily_sum(df, estimate_reach(df)).reset_index(name='estimated_reach')
 
 
 def get_average_post_engagement(df):
-    total_engagement = (df['post_likes'] + df['post_video_view_count'] + df['post_comments']).sum()
-    total_posts = len(df)
+    total_engagement = df['engagement'].sum()
+    total_posts = df['post_count'].sum()
     avg_engagement = total_engagement / total_posts if total_posts > 0 else 0
     return format_number(avg_engagement)
 
 
 def get_post_trends_over_time(df):
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date'])
-
     # Filter only posts from start_year onwards
-    df = df[df['post_upload_date'].dt.year >= 2021]
+    df = date_slice(df, start='2021-01-01', column='date')
 
-    post_trend = (
-        df.groupby(df['post_upload_date'].dt.date)
-        .size()
-        .reset_index(name='post_count')
-        .rename(columns={'post_upload_date': 'date'})
-    )
+    post_trend = daily_sum(df, df['post_count']).reset_index(name='post_count')
     return post_trend
 
 
 def get_yearly_post_trend(df, start_year=2021):
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date'])
-    df['year'] = df['post_upload_date'].dt.year
     df = df[df['year'] >= start_year]
-    yearly_post_counts = df.groupby('year').size().reset_index(name='post_count')
+    yearly_post_counts = df.groupby('year')['post_count'].sum().reset_index()
     return yearly_post_counts
 
 def get_engagement_trends_over_time(df):
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date'])
-
     # Filter from specified start year
-    df = df[df['post_upload_date'].dt.year >= 2021]
+    df = date_slice(df, start='2021-01-01', column='date')
 
-    df['post_likes'] = df['post_likes'].fillna(0)
-    df['post_video_view_count'] = df['post_video_view_count'].fillna(0)
-    df['post_comments'] = df['post_comments'].fillna(0)
-    
-    df['engagement'] = df['post_likes'] + df['post_video_view_count'] + df['post_comments']
-
-    engagement_trend = (
-        df.groupby(df['post_upload_date'].dt.date)['engagement']
-        .sum()
-        .reset_index()
-        .rename(columns={'post_upload_date': 'date'})
-    )
+    engagement_trend = daily_sum(df, df['engagement']).reset_index(name='engagement')
 
     return engagement_trend
 
 
 def get_top_themes(df, top_n=5):
     top_themes = (
-        df['theme']
-        .value_counts()
+        total_by(df, 'theme')
+        .loc[lambda counts: counts > 0]
         .head(top_n)
         .reset_index()
     )
@@ -127,8 +169,8 @@ def get_top_themes(df, top_n=5):
 
 def get_theme_distribution(df):
     theme_distribution = (
-        df['theme']
-        .value_counts(dropna=True)
+        total_by(df, 'theme')
+        .loc[lambda counts: counts > 0]
         .reset_index()
     )
     theme_distribution.columns = ['theme', 'post_count']
@@ -136,96 +178,39 @@ def get_theme_distribution(df):
 
 
 def get_top_theme_trends(df, top_n=3):
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date', 'theme'])
-    top_themes = df['theme'].value_counts().nlargest(top_n).index.tolist()
+    top_themes = total_by(df, 'theme').nlargest(top_n).index.tolist()
     df_top = df[df['theme'].isin(top_themes)]
     trend_df = (
-        df_top.groupby([df_top['post_upload_date'].dt.date, 'theme'])
-        .size()
-        .reset_index(name='post_count')
-        .rename(columns={'post_upload_date': 'date'})
+        df_top.groupby(['date', 'theme'], observed=True)['post_count']
+        .sum()
+        .reset_index()
     )
     return trend_df
 
 
 def get_fastest_growing_themes(df, top_n=3):
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date', 'theme'])
     grouped = (
-        df.groupby([df['post_upload_date'].dt.date, 'theme'])
-        .size()
+        df.groupby(['date', 'theme'], observed=True)['post_count']
+        .sum()
         .reset_index(name='daily_post_count')
-        .rename(columns={'post_upload_date': 'date'})
     )
     grouped = grouped.sort_values(by=['theme', 'date'])
-    grouped['cumulative_post_count'] = grouped.groupby('theme')['daily_post_count'].cumsum()
-    growth_rates = []
-    for theme, group in grouped.groupby('theme'):
-        if len(group) >= 2:
-            days = np.arange(len(group))
-            values = group['cumulative_post_count'].values
-            slope = np.polyfit(days, values, 1)[0]
-            growth_rates.append((theme, slope))
-    fastest = sorted(growth_rates, key=lambda x: x[1], reverse=True)[:top_n]
-    top_themes = [t[0] for t in fastest]
+    grouped['cumulative_post_count'] = grouped.groupby('theme', observed=True)['daily_post_count'].cumsum()
+    top_themes = fastest_growing_groups(grouped, 'theme', top_n=top_n)
     result = grouped[grouped['theme'].isin(top_themes)]
     return result
 
 
 def get_top_growing_themes_per_year(df, top_n=3, last_n_years=5):
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date', 'theme'])
-    df['year'] = df['post_upload_date'].dt.year
     current_year = datetime.now().year
     recent_years = list(range(current_year - last_n_years + 1, current_year + 1))
-    df = df[df['year'].isin(recent_years)]
-    results = []
-    for year in recent_years:
-        yearly_df = df[df['year'] == year]
-        grouped = (
-            yearly_df.groupby([yearly_df['post_upload_date'].dt.date, 'theme'])
-            .size()
-            .reset_index(name='daily_post_count')
-            .sort_values(by=['theme', 'post_upload_date'])
-        )
-        grouped['cumulative_post_count'] = grouped.groupby('theme')['daily_post_count'].cumsum()
-        growth = grouped.groupby('theme')['cumulative_post_count'].agg(['first', 'last']).reset_index()
-        growth['growth'] = growth['last'] - growth['first']
-        top_themes = growth.nlargest(top_n, 'growth')
-        for _, row in top_themes.iterrows():
-            results.append({
-                'year': year,
-                'theme': row['theme'],
-                'growth': row['growth']
-            })
-    return pd.DataFrame(results)
-
-
-def get_theme_color_map(df):
-    import plotly.express as px
-    unique_themes = df['theme'].dropna().unique()
-    base_colors = px.colors.qualitative.Set3 + px.colors.qualitative.Bold + px.colors.qualitative.Dark24
-    return {theme: base_colors[i % len(base_colors)] for i, theme in enumerate(sorted(unique_themes))}
-
-
-theme_color_map = get_theme_color_map(df)
-
-
-def get_sub_theme_color_map(df):
-    import plotly.express as px
-    unique_keywords = df['matched_keyword'].dropna().unique()
-    base_colors = px.colors.qualitative.Set3 + px.colors.qualitative.Bold + px.colors.qualitative.Dark24
-    return {k: base_colors[i % len(base_colors)] for i, k in enumerate(sorted(unique_keywords))}
-
-
-sub_theme_color_map = get_sub_theme_color_map(df)
+    return top_growth_per_year(df, 'theme', recent_years, top_n=top_n, count='post_count')
 
 
 def get_top_sub_themes(df, top_n=5):
     top_keywords = (
-        df['matched_keyword']
-        .value_counts()
+        total_by(df, 'matched_keyword')
+        .loc[lambda counts: counts > 0]
         .head(top_n)
         .reset_index()
     )
@@ -235,8 +220,8 @@ def get_top_sub_themes(df, top_n=5):
 
 def get_sub_theme_distribution(df, top_n=10):
     distribution = (
-        df['matched_keyword']
-        .value_counts(dropna=True)
+        total_by(df, 'matched_keyword')
+        .loc[lambda counts: counts > 0]
         .head(top_n)
         .reset_index()
     )
@@ -245,67 +230,70 @@ def get_sub_theme_distribution(df, top_n=10):
 
 
 def get_top_sub_theme_trends(df, top_n=3):
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date', 'matched_keyword'])
-    top_keywords = df['matched_keyword'].value_counts().nlargest(top_n).index.tolist()
+    top_keywords = total_by(df, 'matched_keyword').nlargest(top_n).index.tolist()
     df_top = df[df['matched_keyword'].isin(top_keywords)]
     trend_df = (
-        df_top.groupby([df_top['post_upload_date'].dt.date, 'matched_keyword'])
-        .size()
-        .reset_index(name='post_count')
-        .rename(columns={'post_upload_date': 'date'})
+        df_top.groupby(['date', 'matched_keyword'], observed=True)['post_count']
+        .sum()
+        .reset_index()
     )
     return trend_df
 
 
 def get_fastest_growing_sub_themes(df, top_n=3):
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date', 'matched_keyword'])
     grouped = (
-        df.groupby([df['post_upload_date'].dt.date, 'matched_keyword'])
-        .size()
+        df.groupby(['date', 'matched_keyword'], observed=True)['post_count']
+        .sum()
         .reset_index(name='daily_post_count')
-        .rename(columns={'post_upload_date': 'date'})
     )
     grouped = grouped.sort_values(by=['matched_keyword', 'date'])
-    grouped['cumulative_post_count'] = grouped.groupby('matched_keyword')['daily_post_count'].cumsum()
-    growth_rates = []
-    for keyword, group in grouped.groupby('matched_keyword'):
-        if len(group) >= 2:
-            days = np.arange(len(group))
-            values = group['cumulative_post_count'].values
-            slope = np.polyfit(days, values, 1)[0]
-            growth_rates.append((keyword, slope))
-    fastest = sorted(growth_rates, key=lambda x: x[1], reverse=True)[:top_n]
-    top_keywords = [k[0] for k in fastest]
+    grouped['cumulative_post_count'] = grouped.groupby('matched_keyword', observed=True)['daily_post_count'].cumsum()
+    top_keywords = fastest_growing_groups(grouped, 'matched_keyword', top_n=top_n)
     result = grouped[grouped['matched_keyword'].isin(top_keywords)]
     return result
 
 
 def get_top_growing_sub_themes_per_year(df, top_n=3, last_n_years=5):
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date', 'matched_keyword'])
-    df['year'] = df['post_upload_date'].dt.year
     current_year = datetime.now().year
     recent_years = list(range(current_year - last_n_years + 1, current_year + 1))
-    df = df[df['year'].isin(recent_years)]
-    results = []
-    for year in recent_years:
-        yearly_df = df[df['year'] == year]
-        grouped = (
-            yearly_df.groupby([yearly_df['post_upload_date'].dt.date, 'matched_keyword'])
-            .size()
-            .reset_index(name='daily_post_count')
-            .sort_values(by=['matched_keyword', 'post_upload_date'])
-        )
-        grouped['cumulative_post_count'] = grouped.groupby('matched_keyword')['daily_post_count'].cumsum()
-        growth = grouped.groupby('matched_keyword')['cumulative_post_count'].agg(['first', 'last']).reset_index()
-        growth['growth'] = growth['last'] - growth['first']
-        top_keywords = growth.nlargest(top_n, 'growth')
-        for _, row in top_keywords.iterrows():
-            results.append({
-                'year': year,
-                'matched_keyword': row['matched_keyword'],
-                'growth': row['growth']
-            })
-    return pd.DataFrame(results)
+    return top_growth_per_year(df, 'matched_keyword', recent_years, top_n=top_n, count='post_count')
+
+
+def page_results(df, section=None):
+    """
+    The KPIs of the Brand Led Analysis page (section None),
+    or the chart inputs of one of its SECTIONS, computed from one filtered
+    rollup. Sections are computed separately so that only the one on
+    screen has to be.
+    """
+    if section is None:
+        return {
+            'total_unique_accounts': get_total_unique_accounts(df),
+            'total_countries': get_total_countries(df),
+            'total_volume': get_total_volume(df),
+            'total_engagement': get_total_engagement(df),
+            'average_post_engagement': get_average_post_engagement(df),
+            'total_estimated_reach': get_total_estimated_reach(df),
+        }
+    if section == 'Overall':
+        return {
+            'yearly_post_trend': get_yearly_post_trend(df, start_year=2021),
+            'post_trends_over_time': get_post_trends_over_time(df),
+            'engagement_trends_over_time': get_engagement_trends_over_time(df),
+            'top_10_accounts_by_volume': get_top_10_accounts_by_volume(df),
+        }
+    if section == 'Theme':
+        return {
+            'top_themes': get_top_themes(df),
+            'theme_distribution': get_theme_distribution(df),
+            'top_theme_trends': get_top_theme_trends(df),
+            'fastest_growing_themes': get_fastest_growing_themes(df),
+            'top_growing_themes_per_year': get_top_growing_themes_per_year(df),
+        }
+    return {
+        'top_sub_themes': get_top_sub_themes(df),
+        'sub_theme_distribution': get_sub_theme_distribution(df),
+        'top_sub_theme_trends': get_top_sub_theme_trends(df),
+        'fastest_growing_sub_themes': get_fastest_growing_sub_themes(df),
+        'top_growing_sub_themes_per_year': get_top_growing_sub_themes_per_year(df),
+    }
@@ -0,0 +1,180 @@
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+
+from fragments import timed_fragment
+from result_cache import result_cache
+
+
+# Points drawn per line chart, shared by its series; about one per pixel of a half-width chart
+MAX_POINTS = 800
+
+# Points per figure above which scatter/line traces are drawn with WebGL instead of SVG
+WEBGL_POINTS = 1000
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Positions of the points kept by Largest-Triangle-Three-Buckets
+    downsampling of one series sorted by x: the first and last points, and
+    from each of threshold - 2 equal buckets in between the point forming
+    the largest triangle with the previously kept point and the mean of the
+    next bucket. Peaks and dips survive, unlike with striding or averaging.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    # Mean point of every bucket, the last "bucket" being the final point
+    sums_x = np.add.reduceat(x[:-1], edges[:-1])
+    sums_y = np.add.reduceat(y[:-1], edges[:-1])
+    counts = np.diff(edges)
+    mean_x = np.append(sums_x / counts, x[-1])
+    mean_y = np.append(sums_y / counts, y[-1])
+
+    kept = np.empty(threshold, dtype=np.intp)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        # Twice the triangle area, for every candidate of the bucket at once
+        area = np.abs(
+            (x[a] - mean_x[bucket + 1]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (mean_y[bucket + 1] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        kept[bucket + 1] = a
+    return kept
+
+
+def downsample(df, x, y, color=None, max_points=MAX_POINTS):
+    """
+    The rows of a line chart frame that LTTB keeps for each series (one per
+    `color` value), splitting `max_points` evenly between the series.
+    Frames within the budget come back unchanged.
+    """
+    if len(df) <= max_points:
+        return df
+    if color is None:
+        groups = [np.arange(len(df))]
+    else:
+        groups = list(df.groupby(color, sort=False, observed=True).indices.values())
+    threshold = max(max_points // len(groups), 3)
+
+    xs = df[x].to_numpy()
+    if np.issubdtype(xs.dtype, np.datetime64):
+        xs = xs.astype('int64')
+    ys = df[y].to_numpy()
+    rows = []
+    for positions in groups:
+        positions = positions[np.argsort(xs[positions], kind='stable')]
+        rows.append(positions[lttb_indices(xs[positions], ys[positions], threshold)])
+    return df.iloc[np.concatenate(rows)]
+
+
+def selected_range(key):
+    """
+    The x range of the box currently selected on the chart rendered under
+    `key`, or None. Dates come back as Timestamps.
+    """
+    state = st.session_state.get(key)
+    boxes = state.get('selection', {}).get('box', []) if state else []
+    if not boxes:
+        return None
+    lo, hi = sorted(boxes[-1]['x'])
+    if isinstance(lo, str):
+        lo, hi = pd.Timestamp(lo), pd.Timestamp(hi)
+    return lo, hi
+
+
+def line_chart(df, x, y, key, color=None, max_points=MAX_POINTS, **kwargs):
+    """
+    px.line of `df` downsampled to `max_points`. Box-selecting a range of the
+    chart rendered with show_chart under the same `key` redraws just that
+    range, which is at full resolution once it fits the budget;
+    double-clicking clears the selection and goes back to the whole series.
+    """
+    window = selected_range(key)
+    if window is not None:
+        df = df[df[x].between(*window)]
+    fig = px.line(downsample(df, x, y, color, max_points), x=x, y=y, color=color, **kwargs)
+    if window is not None:
+        fig.update_xaxes(range=list(window))
+    return fig
+
+
+def compact_figure(fig, webgl_points=WEBGL_POINTS):
+    """
+    Readies a figure for the browser. Scatter traces become Scattergl once
+    the figure plots more than `webgl_points` points, counted over all its
+    traces: a line_chart keeps at least 3 points per series, so one with
+    many series can exceed MAX_POINTS, as can scatter figures built
+    without it (WebGL has no spline, so those lines turn straight). Numeric
+    x/y values are held as numpy arrays, which plotly sends as base64
+    typed arrays rather than JSON number lists, and dates without a time
+    of day are sent as 'YYYY-MM-DD'.
+    """
+    points = sum(len(trace.x) for trace in fig.data if isinstance(trace, go.Scatter) and trace.x is not None)
+    if points > webgl_points:
+        fig = go.Figure(
+            [go.Scattergl(trace.to_plotly_json(), skip_invalid=True) if isinstance(trace, go.Scatter) else trace
+             for trace in fig.data],
+            fig.layout,
+        )
+
+    for trace in fig.data:
+        for axis in ('x', 'y'):
+            values = getattr(trace, axis, None)
+            if values is None or isinstance(values, str):
+                continue
+            values = np.asarray(values)
+            if values.dtype.kind == 'M':
+                days = values.astype('datetime64[D]')
+                if (days == values).all():
+                    trace[axis] = np.datetime_as_string(days, unit='D')
+            elif values.dtype.kind in 'iuf' and not isinstance(trace[axis], np.ndarray):
+                trace[axis] = values
+    return fig
+
+
+def cached_figure(chart_id, state, build):
+    """
+    The serialized figure of `chart_id` for `state`, a hashable of all the
+    figure depends on (dataset version, filters, colors), from the shared
+    result cache. build() runs, and its figure goes through compact_figure
+    and to JSON, only on a miss. The box selected on the chart, when
+    rendered under chart_id, is part of the key.
+    """
+    key = ('figure', chart_id, state, selected_range(chart_id))
+    return result_cache.get_or_compute(key, lambda: pio.to_json(compact_figure(build()), validate=False))
+
+
+def show_chart(fig, key=None):
+    """
+    Renders a figure, or the JSON of one from cached_figure, through
+    compact_figure. Under a `key`, box selection is enabled, so selecting a
+    range of a line_chart zooms into it.
+    """
+    fig = json.loads(fig) if isinstance(fig, str) else compact_figure(fig)
+    if key is None:
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.plotly_chart(fig, use_container_width=True, key=key, on_select='rerun', selection_mode='box')
+
+
+@timed_fragment
+def zoomable_chart(chart_id, state, build):
+    """
+    show_chart of cached_figure(chart_id, state, build) under the key
+    chart_id, as a fragment of its own: box-selecting a range reruns this
+    chart only, with the state and build of the last page run.
+    """
+    show_chart(cached_figure(chart_id, state, build), chart_id)
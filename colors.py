@@ -0,0 +1,157 @@
+import colorsys
+import json
+import os
+import threading
+from itertools import chain, cycle
+
+import numpy as np
+import plotly.colors
+import plotly.express as px
+from streamlit.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+KINDS = ['theme', 'keyword', 'brand']
+
+# Where the colors handed out are kept between runs, next to the data files
+COLORS_PATH = 'colors.json'
+
+# Colors handed out first, in this order
+BASE_COLORS = px.colors.qualitative.Set3 + px.colors.qualitative.Bold + px.colors.qualitative.Dark24
+
+# Smallest CIELAB distance (delta E) kept between two base colors
+MIN_DISTANCE = 10
+
+# palette(), built on first use
+_palette = None
+
+# {kind: {name: color}}, read from COLORS_PATH on first use. A change replaces
+# the changed kind's dict and the outer one, so maps handed out stay as they were.
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def lab(rgb):
+    """CIELAB (D65) coordinates of sRGB colors given as an (n, 3) array of values in [0, 1]."""
+    linear = np.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+    xyz = linear @ np.array([
+        [0.4124, 0.3576, 0.1805],
+        [0.2126, 0.7152, 0.0722],
+        [0.0193, 0.1192, 0.9505],
+    ]).T / np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.column_stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])])
+
+
+def hsv_grid():
+    """Candidate colors beyond BASE_COLORS: 72 hues at four saturations and four values, as RGB rows."""
+    return np.array([
+        colorsys.hsv_to_rgb(hue / 72, saturation, value)
+        for hue in range(72)
+        for saturation in (0.4, 0.6, 0.8, 1.0)
+        for value in (0.45, 0.6, 0.75, 0.9)
+    ])
+
+
+def build_palette(base_colors=BASE_COLORS, min_distance=MIN_DISTANCE):
+    """
+    Distinct colors as '#rrggbb', each as far as possible from those before
+    it. The base colors come first, minus any within min_distance of one
+    already taken; then each next color is the hsv_grid candidate farthest
+    from all taken so far, until every candidate is taken. The distances of
+    every candidate to the taken colors are kept in one array and updated a
+    whole column at a time. The first few hundred colors are at least
+    min_distance apart, the rest come closer.
+    """
+    base = np.array(plotly.colors.convert_colors_to_same_type(list(base_colors), 'tuple')[0]).reshape(-1, 3)
+    rgb = np.vstack([base, hsv_grid()])
+    points = lab(rgb)
+    # Distance of every candidate to the nearest color taken
+    nearest = np.full(len(rgb), np.inf)
+    taken = []
+
+    def take(i):
+        nonlocal nearest
+        taken.append(i)
+        nearest = np.minimum(nearest, np.linalg.norm(points - points[i], axis=1))
+
+    for i in range(len(base)):
+        if nearest[i] >= min_distance:
+            take(i)
+    while True:
+        i = len(base) + int(np.argmax(nearest[len(base):]))
+        if nearest[i] == 0:
+            break
+        take(i)
+
+    return list(dict.fromkeys('#{:02x}{:02x}{:02x}'.format(*np.rint(rgb[i] * 255).astype(int)) for i in taken))
+
+
+def palette():
+    """build_palette(), built on first use."""
+    global _palette
+    if _palette is None:
+        _palette = build_palette()
+    return _palette
+
+
+def _read_registry(path):
+    try:
+        with open(path) as f:
+            stored = json.load(f)
+    except FileNotFoundError:
+        stored = {}
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read %s, assigning colors afresh: %s", path, e)
+        stored = {}
+    return {kind: dict(stored.get(kind, {})) for kind in KINDS}
+
+
+def _write_registry(path, registry):
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(registry, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("Could not save colors to %s, keeping them for this run only: %s", path, e)
+
+
+def _loaded():
+    global _registry
+    if _registry is None:
+        _registry = _read_registry(COLORS_PATH)
+    return _registry
+
+
+def register_names(kind, names):
+    """
+    Gives the names of `kind` ('theme', 'keyword' or 'brand') not seen
+    before, in sorted order, the first palette colors no name of that kind
+    has yet, and saves the assignment to COLORS_PATH. A name keeps its color
+    from then on, on every page and across restarts, and the names of a
+    kind all differ in color until its palette is used up; past that,
+    colors are handed out again from the start. The data modules register
+    their names when their files are loaded.
+    """
+    global _registry
+    with _registry_lock:
+        assigned = _loaded()[kind]
+        new = sorted({str(name) for name in names} - assigned.keys())
+        if not new:
+            return
+        used = set(assigned.values())
+        free = chain((color for color in palette() if color not in used), cycle(palette()))
+        _registry = {**_registry, kind: {**assigned, **{name: next(free) for name in new}}}
+        _write_registry(COLORS_PATH, _registry)
+
+
+def load_colors():
+    """
+    {kind: {name: color}} of every theme, keyword and brand registered so
+    far, for color_discrete_map. Pages only look colors up, and a name's
+    color never changes, so figures need no color key.
+    """
+    with _registry_lock:
+        return _loaded()
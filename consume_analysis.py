@@ -4,16 +4,24 @@ from consumer_data import *
 from datetime import datetime
 import datetime
 from chat import chat
+from charts import cached_figure, line_chart, show_chart, zoomable_chart
+from colors import load_colors
+from filter_index import filter_frame
+from fragments import page_computation, sections_fragment, timed_fragment
+from result_cache import result_cache, filter_key
 
+@timed_fragment
 def cla():
     st.subheader("Consumer Led Analysis")
 
+    data = load_data()
+    df = data['posts']
+
     f1, f2, f3, f4 = st.columns([2, 2, 2, 3])
 
     themes = sorted(df['matched_theme'].dropna().unique())
     sub_themes = sorted(df['matched_keyword'].dropna().unique())
     countries = sorted(df['country'].dropna().unique())
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
     min_date = df['post_upload_date'].min()
     max_date = df['post_upload_date'].max()
 
@@ -30,27 +38,32 @@ def cla():
         selected_date_range = st.date_input("Date Range", [min_date, max_date], min_value=min_date, max_value=max_date)
 
     # 🧼 Filtering Logic
-    filtered_df = df.copy()
+    start_date = datetime.datetime.combine(selected_date_range[0], datetime.datetime.min.time())
+    end_date = datetime.datetime.combine(selected_date_range[1], datetime.datetime.max.time())
 
-    if selected_themes:
-        filtered_df = filtered_df[filtered_df['matched_theme'].isin(selected_themes)]
+    selections = {
+        'matched_theme': selected_themes,
+        'matched_keyword': selected_sub_themes,
+        'country': selected_countries,
+    }
 
-    if selected_sub_themes:
-        filtered_df = filtered_df[filtered_df['matched_keyword'].isin(selected_sub_themes)]
+    filters = filter_key(selections, start_date, end_date)
 
-    if selected_countries:
-        filtered_df = filtered_df[filtered_df['country'].isin(selected_countries)]
+    # Distinct accounts cannot be summed up from the rollup; they are counted on the matching posts
+    def compute(section):
+        rollup = filter_frame(data['rollup'], data['rollup_index'], selections, start_date, end_date, 'date')
+        if section is not None:
+            return page_results(rollup, section=section)
+        return page_results(rollup, filter_frame(df, data['filter_index'], selections, start_date, end_date))
 
-    start_date = datetime.datetime.combine(selected_date_range[0], datetime.datetime.min.time())
-    end_date = datetime.datetime.combine(selected_date_range[1], datetime.datetime.max.time())
+    computation = page_computation('cla', data['version'], filters, compute)
+    results = result_cache.get_or_compute(*computation())
 
-    filtered_df = filtered_df[
-        filtered_df['post_upload_date'].between(start_date, end_date)
-    ]
+    colors = load_colors()
+    theme_color_map = colors['theme']
+    sub_theme_color_map = colors['keyword']
 
-    # Refresh color maps for filtered data
-    theme_color_map = get_theme_color_map(filtered_df)
-    sub_theme_color_map = get_sub_theme_color_map(filtered_df)
+    figure_state = (data['version'], filters)
 
     st.markdown("""
         <style>
@@ -99,7 +112,7 @@ def cla():
         st.markdown(f"""
         <div class="metric-box">
             <div class="metric-title">🌍 Total Countries</div>
-            <div class="metric-value">{get_total_countries(filtered_df)}</div>
+            <div class="metric-value">{results['total_countries']}</div>
         </div>
         """, unsafe_allow_html=True)
 
@@ -107,7 +120,7 @@ def cla():
         st.markdown(f"""
         <div class="metric-box">
             <div class="metric-title">🔐 Unique Accounts</div>
-            <div class="metric-value">{get_total_unique_accounts(filtered_df)}</div>
+            <div class="metric-value">{results['total_unique_accounts']}</div>
         </div>
         """, unsafe_allow_html=True)
 
@@ -115,7 +128,7 @@ def cla():
         st.markdown(f"""
         <div class="metric-box">
             <div class="metric-title">📸 Total Volume</div>
-            <div class="metric-value">{get_total_volume(filtered_df)}</div>
+            <div class="metric-value">{results['total_volume']}</div>
         </div>
         """, unsafe_allow_html=True)
 
@@ -123,7 +136,7 @@ def cla():
         st.markdown(f"""
         <div class="metric-box">
             <div class="metric-title">💬 Total Engagements</div>
-            <div class="metric-value">{get_total_engagement(filtered_df)}</div>
+            <div class="metric-value">{results['total_engagement']}</div>
         </div>
         """, unsafe_allow_html=True)
 
@@ -131,133 +144,162 @@ def cla():
         st.markdown(f"""
         <div class="metric-box">
             <div class="metric-title">👥 Avg Post Engagement</div>
-            <div class="metric-value">{get_average_post_engagement(filtered_df)}</div>
+            <div class="metric-value">{results['average_post_engagement']}</div>
         </div>
         """, unsafe_allow_html=True)
 
     # ───────────────────────────────────────────────
     # 📊 Tabs
-    overall_tab, theme_tab, sub_theme_tab, sixthai_tab = st.tabs(["Overall", "Theme", "Sub Theme", "Ask SixthAI"])
-
-    with overall_tab:
-        col1, col2 = st.columns(2)
-
-        with col1:
-            yearly_post_df = get_yearly_post_trend(filtered_df)
-            fig = px.bar(yearly_post_df, x='year', y='post_count', title='📅 Yearly Post Volume (Last 5 Years)',
-                         text='post_count', labels={'year': 'Year', 'post_count': 'Volume'})
-            fig.update_layout(template="plotly_white", xaxis=dict(type='category'))
-            fig.update_traces(textposition='outside', width=0.4)
-            st.plotly_chart(fig, use_container_width=True)
-
-        with col2:
-            post_trend_df = get_post_trends_over_time(filtered_df)
-            fig = px.line(post_trend_df, x='date', y='post_count', title='📈 Post Volume Over Time',
-                          labels={'date': 'Date', 'post_count': 'Volume'},
-                          markers=True, color_discrete_map=theme_color_map)
-            fig.update_layout(template="plotly_white")
-            st.plotly_chart(fig, use_container_width=True)
-
-        engagement_df = get_engagement_trends_over_time(filtered_df)
-        fig = px.line(engagement_df, x='date', y='engagement', title='📈 Engagement Trend',
-                      labels={'date': 'Date', 'engagement': 'Total Engagement'},
-                      markers=True, color_discrete_map=theme_color_map)
-        fig.update_layout(template="plotly_white")
-        st.plotly_chart(fig, use_container_width=True)
+    # Each line chart is a fragment of its own for box zoom
+    @sections_fragment("cla_section", SECTIONS, computation)
+    def sections(section, results):
+        if section == "Overall":
+            col1, col2 = st.columns(2)
+
+            with col1:
+                def yearly_post_chart():
+                    yearly_post_df = results['yearly_post_trend']
+                    fig = px.bar(yearly_post_df, x='year', y='post_count', title='📅 Yearly Post Volume (Last 5 Years)',
+                                 text='post_count', labels={'year': 'Year', 'post_count': 'Volume'})
+                    fig.update_layout(template="plotly_white", xaxis=dict(type='category'))
+                    fig.update_traces(textposition='outside', width=0.4)
+                    return fig
+                show_chart(cached_figure('cla_yearly_post_trend', figure_state, yearly_post_chart))
+
+            with col2:
+                def post_trend_chart():
+                    post_trend_df = results['post_trends_over_time']
+                    fig = line_chart(post_trend_df, x='date', y='post_count', key='cla_post_trends', title='📈 Post Volume Over Time',
+                                     labels={'date': 'Date', 'post_count': 'Volume'},
+                                     markers=True, color_discrete_map=theme_color_map)
+                    fig.update_layout(template="plotly_white")
+                    return fig
+                zoomable_chart('cla_post_trends', figure_state, post_trend_chart)
+
+            def engagement_chart():
+                engagement_df = results['engagement_trends_over_time']
+                fig = line_chart(engagement_df, x='date', y='engagement', key='cla_engagement_trends', title='📈 Engagement Trend',
+                                 labels={'date': 'Date', 'engagement': 'Total Engagement'},
+                                 markers=True, color_discrete_map=theme_color_map)
+                fig.update_layout(template="plotly_white")
+                return fig
+            zoomable_chart('cla_engagement_trends', figure_state, engagement_chart)
  
-    with theme_tab:
-        col1, col2 = st.columns(2)
-
-        with col1:
-            top_themes_df = get_top_themes(filtered_df)
-            fig = px.bar(top_themes_df, x='matched_theme', y='post_count', text='post_count',
-                         title='Top 5 Most Frequent Themes', color='matched_theme',
-                         color_discrete_map=theme_color_map)
-            fig.update_layout(template="plotly_white", xaxis_title="Theme", yaxis_title="Volume")
-            fig.update_traces(textposition='outside')
-            st.plotly_chart(fig, use_container_width=True)
-
-        with col2:
-            theme_distribution_df = get_theme_distribution(filtered_df)
-            fig = px.pie(theme_distribution_df, names='matched_theme', values='post_count',
-                         title='🎯 Theme-wise Post Distribution', hole=0.4,
-                         color='matched_theme', color_discrete_map=theme_color_map)
-            fig.update_traces(textinfo='percent', pull=[0.03]*len(theme_distribution_df))
-            st.plotly_chart(fig, use_container_width=True)
-
-        top_theme_trend_df = get_top_theme_trends(filtered_df)
-        fig = px.line(top_theme_trend_df, x='date', y='post_count', color='matched_theme',
-                      title='📅 Top 3 Themes - Post Trends Over Time',
-                      labels={'date': 'Date', 'post_count': 'Volume'},
-                      markers=True, color_discrete_map=theme_color_map)
-        fig.update_layout(template="plotly_white")
-        st.plotly_chart(fig, use_container_width=True)
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            fast_growth_df = get_fastest_growing_themes(filtered_df)
-            fig = px.line(fast_growth_df, x='date', y='cumulative_post_count', color='matched_theme',
-                          title='🚀 Fastest Growing Themes Over Time',
-                          labels={'date': 'Date', 'cumulative_post_count': 'Cumulative Volume'},
-                          markers=True, color_discrete_map=theme_color_map)
-            fig.update_layout(template="plotly_white")
-            st.plotly_chart(fig, use_container_width=True)
-
-        with col2:
-            top_growth_yearly_df = get_top_growing_themes_per_year(filtered_df)
-            fig = px.bar(top_growth_yearly_df, x='year', y='growth', color='matched_theme',
-                         title='📊 Top 3 Fastest Growing Themes Per Year (Last 5 Years)',
-                         barmode='group', color_discrete_map=theme_color_map)
-            fig.update_layout(template="plotly_white", xaxis=dict(type='category'))
-            st.plotly_chart(fig, use_container_width=True)
-
-    with sub_theme_tab:
-        col1, col2 = st.columns(2)
-
-        with col1:
-            top_sub_themes_df = get_top_sub_themes(filtered_df)
-            fig = px.bar(top_sub_themes_df, x='matched_keyword', y='post_count',
-                         title='Top 5 Most Frequent Sub Themes', text='post_count',
-                         color='matched_keyword', color_discrete_map=sub_theme_color_map)
-            fig.update_layout(template="plotly_white", xaxis_title="Sub Theme", yaxis_title="Volume")
-            fig.update_traces(textposition='outside')
-            st.plotly_chart(fig, use_container_width=True)
-
-        with col2:
-            sub_theme_distribution_df = get_sub_theme_distribution(filtered_df)
-            fig = px.pie(sub_theme_distribution_df, names='matched_keyword', values='post_count',
-                         title='🎯 Sub Theme-wise Post Distribution', hole=0.4,
-                         color='matched_keyword', color_discrete_map=sub_theme_color_map)
-            fig.update_traces(textinfo='percent', pull=[0.03]*len(sub_theme_distribution_df))
-            st.plotly_chart(fig, use_container_width=True)
-
-        top_sub_theme_trend_df = get_top_sub_theme_trends(filtered_df)
-        fig = px.line(top_sub_theme_trend_df, x='date', y='post_count', color='matched_keyword',
-                      title='📅 Top 3 Sub Themes - Post Trends Over Time',
-                      labels={'date': 'Date', 'post_count': 'Volume'},
-                      markers=True, color_discrete_map=sub_theme_color_map)
-        fig.update_layout(template="plotly_white")
-        st.plotly_chart(fig, use_container_width=True)
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            fast_sub_growth_df = get_fastest_growing_sub_themes(filtered_df)
-            fig = px.line(fast_sub_growth_df, x='date', y='cumulative_post_count', color='matched_keyword',
-                          title='🚀 Fastest Growing Sub Themes Over Time',
-                          labels={'date': 'Date', 'cumulative_post_count': 'Cumulative Volume'},
-                          markers=True, color_discrete_map=sub_theme_color_map)
-            fig.update_layout(template="plotly_white")
-            st.plotly_chart(fig, use_container_width=True)
-
-        with col2:
-            sub_theme_growth_yearly_df = get_top_growing_sub_themes_per_year(filtered_df)
-            fig = px.bar(sub_theme_growth_yearly_df, x='year', y='growth', color='matched_keyword',
-                         title='📊 Top 3 Fastest Growing Sub Themes Per Year (Last 5 Years)',
-                         barmode='group', color_discrete_map=sub_theme_color_map)
-            fig.update_layout(template="plotly_white", xaxis=dict(type='category'))
-            st.plotly_chart(fig, use_container_width=True)
-
-    with sixthai_tab:
-        chat("cla")
\ No newline at end of file
+        elif section == "Theme":
+            col1, col2 = st.columns(2)
+
+            with col1:
+                def top_themes_chart():
+                    top_themes_df = results['top_themes']
+                    fig = px.bar(top_themes_df, x='matched_theme', y='post_count', text='post_count',
+                                 title='Top 5 Most Frequent Themes', color='matched_theme',
+                                 color_discrete_map=theme_color_map)
+                    fig.update_layout(template="plotly_white", xaxis_title="Theme", yaxis_title="Volume")
+                    fig.update_traces(textposition='outside')
+                    return fig
+                show_chart(cached_figure('cla_top_themes', figure_state, top_themes_chart))
+
+            with col2:
+                def theme_distribution_chart():
+                    theme_distribution_df = results['theme_distribution']
+                    fig = px.pie(theme_distribution_df, names='matched_theme', values='post_count',
+                                 title='🎯 Theme-wise Post Distribution', hole=0.4,
+                                 color='matched_theme', color_discrete_map=theme_color_map)
+                    fig.update_traces(textinfo='percent', pull=[0.03]*len(theme_distribution_df))
+                    return fig
+                show_chart(cached_figure('cla_theme_distribution', figure_state, theme_distribution_chart))
+
+            def top_theme_trend_chart():
+                top_theme_trend_df = results['top_theme_trends']
+                fig = line_chart(top_theme_trend_df, x='date', y='post_count', key='cla_top_theme_trends', color='matched_theme',
+                                 title='📅 Top 3 Themes - Post Trends Over Time',
+                                 labels={'date': 'Date', 'post_count': 'Volume'},
+                                 markers=True, color_discrete_map=theme_color_map)
+                fig.update_layout(template="plotly_white")
+                return fig
+            zoomable_chart('cla_top_theme_trends', figure_state, top_theme_trend_chart)
+
+            col1, col2 = st.columns(2)
+
+            with col1:
+                def fast_growth_chart():
+                    fast_growth_df = results['fastest_growing_themes']
+                    fig = line_chart(fast_growth_df, x='date', y='cumulative_post_count', key='cla_fastest_growing_themes', color='matched_theme',
+                                     title='🚀 Fastest Growing Themes Over Time',
+                                     labels={'date': 'Date', 'cumulative_post_count': 'Cumulative Volume'},
+                                     markers=True, color_discrete_map=theme_color_map)
+                    fig.update_layout(template="plotly_white")
+                    return fig
+                zoomable_chart('cla_fastest_growing_themes', figure_state, fast_growth_chart)
+
+            with col2:
+                def top_growth_yearly_chart():
+                    top_growth_yearly_df = results['top_growing_themes_per_year']
+                    fig = px.bar(top_growth_yearly_df, x='year', y='growth', color='matched_theme',
+                                 title='📊 Top 3 Fastest Growing Themes Per Year (Last 5 Years)',
+                                 barmode='group', color_discrete_map=theme_color_map)
+                    fig.update_layout(template="plotly_white", xaxis=dict(type='category'))
+                    return fig
+                show_chart(cached_figure('cla_top_growing_themes_per_year', figure_state, top_growth_yearly_chart))
+
+        elif section == "Sub Theme":
+            col1, col2 = st.columns(2)
+
+            with col1:
+                def top_sub_themes_chart():
+                    top_sub_themes_df = results['top_sub_themes']
+                    fig = px.bar(top_sub_themes_df, x='matched_keyword', y='post_count',
+                                 title='Top 5 Most Frequent Sub Themes', text='post_count',
+                                 color='matched_keyword', color_discrete_map=sub_theme_color_map)
+                    fig.update_layout(template="plotly_white", xaxis_title="Sub Theme", yaxis_title="Volume")
+                    fig.update_traces(textposition='outside')
+                    return fig
+                show_chart(cached_figure('cla_top_sub_themes', figure_state, top_sub_themes_chart))
+
+            with col2:
+                def sub_theme_distribution_chart():
+                    sub_theme_distribution_df = results['sub_theme_distribution']
+                    fig = px.pie(sub_theme_distribution_df, names='matched_keyword', values='post_count',
+                                 title='🎯 Sub Theme-wise Post Distribution', hole=0.4,
+                                 color='matched_keyword', color_discrete_map=sub_theme_color_map)
+                    fig.update_traces(textinfo='percent', pull=[0.03]*len(sub_theme_distribution_df))
+                    return fig
+                show_chart(cached_figure('cla_sub_theme_distribution', figure_state, sub_theme_distribution_chart))
+
+            def top_sub_theme_trend_chart():
+                top_sub_theme_trend_df = results['top_sub_theme_trends']
+                fig = line_chart(top_sub_theme_trend_df, x='date', y='post_count', key='cla_top_sub_theme_trends', color='matched_keyword',
+                                 title='📅 Top 3 Sub Themes - Post Trends Over Time',
+                                 labels={'date': 'Date', 'post_count': 'Volume'},
+                                 markers=True, color_discrete_map=sub_theme_color_map)
+                fig.update_layout(template="plotly_white")
+                return fig
+            zoomable_chart('cla_top_sub_theme_trends', figure_state, top_sub_theme_trend_chart)
+
+            col1, col2 = st.columns(2)
+
+            with col1:
+                def fast_sub_growth_chart():
+                    fast_sub_growth_df = results['fastest_growing_sub_themes']
+                    fig = line_chart(fast_sub_growth_df, x='date', y='cumulative_post_count', key='cla_fastest_growing_sub_themes', color='matched_keyword',
+                                     title='🚀 Fastest Growing Sub Themes Over Time',
+                                     labels={'date': 'Date', 'cumulative_post_count': 'Cumulative Volume'},
+                                     markers=True, color_discrete_map=sub_theme_color_map)
+                    fig.update_layout(template="plotly_white")
+                    return fig
+                zoomable_chart('cla_fastest_growing_sub_themes', figure_state, fast_sub_growth_chart)
+
+            with col2:
+                def sub_theme_growth_yearly_chart():
+                    sub_theme_growth_yearly_df = results['top_growing_sub_themes_per_year']
+                    fig = px.bar(sub_theme_growth_yearly_df, x='year', y='growth', color='matched_keyword',
+                                 title='📊 Top 3 Fastest Growing Sub Themes Per Year (Last 5 Years)',
+                                 barmode='group', color_discrete_map=sub_theme_color_map)
+                    fig.update_layout(template="plotly_white", xaxis=dict(type='category'))
+                    return fig
+                show_chart(cached_figure('cla_top_growing_sub_themes_per_year', figure_state, sub_theme_growth_yearly_chart))
+
+        else:
+            chat("cla")
+
+    sections()
@@ -1,10 +1,46 @@
-import pandas as pd
-import numpy as np
 from datetime import datetime
+from growth import fastest_growing_groups, top_growth_per_year
+from colors import register_names
+from dataset import load_posts, load_once, date_slice, daily_sum
+from filter_index import build_filter_index
+from rollup import build_rollup, total_by
+
+
+# Columns used by the Consumer Led Analysis page
+COLUMNS = [
+    'matched_theme', 'matched_keyword', 'country', 'username', 'post_upload_date',
+    'post_likes', 'post_video_view_count', 'post_comments',
+]
+
+DATA_PATH = "cla-realestate.parquet"
+
+# The page filters and charts run on the daily rollup of the posts. Usernames
+# are left out of it (nearly one per post); distinct accounts are counted on
+# the matching posts instead.
+DIMENSIONS = ['matched_theme', 'matched_keyword', 'country']
+
+# Chart sections of the page, in navigation order; each is computed only when shown
+SECTIONS = ['Overall', 'Theme', 'Sub Theme']
+
+
+def _build_data(path, version):
+    df = load_posts(path, columns=COLUMNS)
+    register_names('theme', df['matched_theme'].cat.categories)
+    register_names('keyword', df['matched_keyword'].cat.categories)
+    rollup = build_rollup(df, DIMENSIONS)
+    return {
+        'version': version,
+        'posts': df,
+        'rollup': rollup,
+        'rollup_index': build_filter_index(rollup, DIMENSIONS),
+        'filter_index': build_filter_index(df, DIMENSIONS),
+    }
 
 
 # Load data
-df = pd.read_parquet("cla-realestate.parquet")
+def load_data():
+    """The page's posts, rollup and filter indexes, loaded when the page is first opened."""
+    return load_once(DATA_PATH, _build_data)
 
 # Utility to format large numbers
 def format_number(num):
@@ -19,7 +55,7 @@ def format_number(num):
 
 # Total number of posts
 def get_total_volume(df):
-    return format_number(len(df))
+    return format_number(df['post_count'].sum())
 
 # Total number of unique countries
 def get_total_countries(df):
@@ -28,9 +64,7 @@ def get_total_countries(df):
 
 # Total engagement (likes + views + comments)
 def get_total_engagement(df):
-    return format_number(
-        (df['post_likes'] + df['post_video_view_count'] + df['post_comments']).sum()
-    )
+    return format_number(df['engagement'].sum())
 
 def get_total_unique_accounts(df):
     return format_number(df['username'].nunique())
@@ -38,76 +72,44 @@ def get_total_unique_accounts(df):
 
 # Average engagement per post
 def get_average_post_engagement(df):
-    total_engagement = (df['post_likes'] + df['post_video_view_count'] + df['post_comments']).sum()
-    total_posts = len(df)
+    total_engagement = df['engagement'].sum()
+    total_posts = df['post_count'].sum()
     avg_engagement = total_engagement / total_posts if total_posts > 0 else 0
     return format_number(avg_engagement)
 
 
 def get_post_trends_over_time(df):
-    # Ensure 'post_upload_date' is datetime
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-
-    # Drop rows with invalid dates
-    df = df.dropna(subset=['post_upload_date'])
-
     # ✅ Filter data from 2021 onwards
-    df = df[df['post_upload_date'] >= pd.Timestamp('2021-01-01')]
-
-    # Group by date
-    post_trend = (
-        df.groupby(df['post_upload_date'].dt.date)
-        .size()
-        .reset_index(name='post_count')
-        .rename(columns={'post_upload_date': 'date'})
-    )
+    df = date_slice(df, start='2021-01-01', column='date')
+
+    # Count posts per day
+    post_trend = daily_sum(df, df['post_count']).reset_index(name='post_count')
 
     return post_trend
 
 
 
 def get_yearly_post_trend(df, last_n_years=5):
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date'])
-
-    df['year'] = df['post_upload_date'].dt.year
     current_year = datetime.now().year
     recent_years = list(range(current_year - last_n_years + 1, current_year + 1))
 
     df = df[df['year'].isin(recent_years)]
 
     yearly_post_counts = (
-        df.groupby('year')
-        .size()
-        .reset_index(name='post_count')
+        df.groupby('year')['post_count']
+        .sum()
+        .reset_index()
     )
 
     return yearly_post_counts
 
 
 def get_engagement_trends_over_time(df):
-    # Ensure date format
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date'])
-
     # ✅ Filter data from 2021 onwards
-    df = df[df['post_upload_date'] >= pd.Timestamp('2021-01-01')]
+    df = date_slice(df, start='2021-01-01', column='date')
 
-    # Fill NaNs in engagement fields
-    df['post_likes'] = df['post_likes'].fillna(0)
-    df['post_video_view_count'] = df['post_video_view_count'].fillna(0)
-    df['post_comments'] = df['post_comments'].fillna(0)
-
-    # Calculate total engagement per row
-    df['engagement'] = df['post_likes'] + df['post_video_view_count'] + df['post_comments']
-
-    # Group by date
-    engagement_trend = (
-        df.groupby(df['post_upload_date'].dt.date)['engagement']
-        .sum()
-        .reset_index()
-        .rename(columns={'post_upload_date': 'date'})
-    )
+    # Sum engagement per day
+    engagement_trend = daily_sum(df, df['engagement']).reset_index(name='engagement')
 
     return engagement_trend
 
@@ -115,8 +117,8 @@ def get_engagement_trends_over_time(df):
 
 def get_top_themes(df, top_n=5):
     top_themes = (
-        df['matched_theme']
-        .value_counts()
+        total_by(df, 'matched_theme')
+        .loc[lambda counts: counts > 0]
         .head(top_n)
         .reset_index()
     )
@@ -131,8 +133,8 @@ def get_theme_distribution(df):
     suitable for pie chart visualization.
     """
     theme_distribution = (
-        df['matched_theme']
-        .value_counts(dropna=True)
+        total_by(df, 'matched_theme')
+        .loc[lambda counts: counts > 0]
         .reset_index()
     )
     theme_distribution.columns = ['matched_theme', 'post_count']
@@ -141,58 +143,35 @@ def get_theme_distribution(df):
 
 
 def get_top_theme_trends(df, top_n=3):
-    # Ensure datetime format
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date', 'matched_theme'])
-
     # Get top N themes
-    top_themes = df['matched_theme'].value_counts().nlargest(top_n).index.tolist()
+    top_themes = total_by(df, 'matched_theme').nlargest(top_n).index.tolist()
 
     # Filter for top themes only
     df_top = df[df['matched_theme'].isin(top_themes)]
 
     # Group by date and theme
     trend_df = (
-        df_top.groupby([df_top['post_upload_date'].dt.date, 'matched_theme'])
-        .size()
-        .reset_index(name='post_count')
-        .rename(columns={'post_upload_date': 'date'})
+        df_top.groupby(['date', 'matched_theme'], observed=True)['post_count']
+        .sum()
+        .reset_index()
     )
 
     return trend_df
 
 
 def get_fastest_growing_themes(df, top_n=3):
-    import numpy as np
-
-    # Clean and prepare
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date', 'matched_theme'])
-
     # Group and compute daily post count
     grouped = (
-        df.groupby([df['post_upload_date'].dt.date, 'matched_theme'])
-        .size()
+        df.groupby(['date', 'matched_theme'], observed=True)['post_count']
+        .sum()
         .reset_index(name='daily_post_count')
-        .rename(columns={'post_upload_date': 'date'})
     )
 
     # Sort and compute cumulative sum
     grouped = grouped.sort_values(by=['matched_theme', 'date'])
-    grouped['cumulative_post_count'] = grouped.groupby('matched_theme')['daily_post_count'].cumsum()
-
-    # Compute growth rate (slope over the full range of data)
-    growth_rates = []
-    for theme, group in grouped.groupby('matched_theme'):
-        if len(group) >= 2:
-            days = np.arange(len(group))
-            values = group['cumulative_post_count'].values
-            slope = np.polyfit(days, values, 1)[0]
-            growth_rates.append((theme, slope))
+    grouped['cumulative_post_count'] = grouped.groupby('matched_theme', observed=True)['daily_post_count'].cumsum()
 
-    # Sort by slope
-    fastest = sorted(growth_rates, key=lambda x: x[1], reverse=True)[:top_n]
-    top_themes = [t[0] for t in fastest]
+    top_themes = fastest_growing_groups(grouped, 'matched_theme', top_n=top_n)
 
     # Filter original data for top themes
     result = grouped[grouped['matched_theme'].isin(top_themes)]
@@ -202,78 +181,18 @@ def get_fastest_growing_themes(df, top_n=3):
 
 
 def get_top_growing_themes_per_year(df, top_n=3, last_n_years=5):
-    import numpy as np
-    from datetime import datetime
-
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date', 'matched_theme'])
-
-    df['year'] = df['post_upload_date'].dt.year
     current_year = datetime.now().year
     recent_years = list(range(current_year - last_n_years + 1, current_year + 1))
-
-    df = df[df['year'].isin(recent_years)]
-
-    results = []
-
-    for year in recent_years:
-        yearly_df = df[df['year'] == year]
-
-        # Daily cumulative post count
-        grouped = (
-            yearly_df.groupby([yearly_df['post_upload_date'].dt.date, 'matched_theme'])
-            .size()
-            .reset_index(name='daily_post_count')
-            .sort_values(by=['matched_theme', 'post_upload_date'])
-        )
-        grouped['cumulative_post_count'] = grouped.groupby('matched_theme')['daily_post_count'].cumsum()
-
-        # Calculate growth (end - start of cumulative)
-        growth = grouped.groupby('matched_theme')['cumulative_post_count'].agg(['first', 'last']).reset_index()
-        growth['growth'] = growth['last'] - growth['first']
-        top_themes = growth.nlargest(top_n, 'growth')
-
-        for _, row in top_themes.iterrows():
-            results.append({
-                'year': year,
-                'matched_theme': row['matched_theme'],
-                'growth': row['growth']
-            })
-
-    result_df = pd.DataFrame(results)
-    return result_df
-
-
-def get_theme_color_map(df):
-    import plotly.express as px
-
-    unique_themes = df['matched_theme'].dropna().unique()
-    base_colors = px.colors.qualitative.Set3 + px.colors.qualitative.Bold + px.colors.qualitative.Dark24
-
-    color_map = {theme: base_colors[i % len(base_colors)] for i, theme in enumerate(sorted(unique_themes))}
-    return color_map
-
-
-theme_color_map = get_theme_color_map(df)
-
+    return top_growth_per_year(df, 'matched_theme', recent_years, top_n=top_n, count='post_count')
 
 
 # Sub themes
 
-def get_sub_theme_color_map(df):
-    import plotly.express as px
-    unique_keywords = df['matched_keyword'].dropna().unique()
-    base_colors = px.colors.qualitative.Set3 + px.colors.qualitative.Bold + px.colors.qualitative.Dark24
-    return {k: base_colors[i % len(base_colors)] for i, k in enumerate(sorted(unique_keywords))}
-
-
-sub_theme_color_map = get_sub_theme_color_map(df)
-
 
 def get_top_sub_themes(df, top_n=5):
     top_keywords = (
-        df['matched_keyword']
-        .value_counts()
+        total_by(df, 'matched_keyword')
+        .loc[lambda counts: counts > 0]
         .head(top_n)
         .reset_index()
     )
@@ -283,8 +202,8 @@ def get_top_sub_themes(df, top_n=5):
 
 def get_sub_theme_distribution(df, top_n=10):
     distribution = (
-        df['matched_keyword']
-        .value_counts(dropna=True)
+        total_by(df, 'matched_keyword')
+        .loc[lambda counts: counts > 0]
         .head(top_n)
         .reset_index()
     )
@@ -293,17 +212,13 @@ def get_sub_theme_distribution(df, top_n=10):
 
 
 def get_top_sub_theme_trends(df, top_n=3):
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date', 'matched_keyword'])
-
-    top_keywords = df['matched_keyword'].value_counts().nlargest(top_n).index.tolist()
+    top_keywords = total_by(df, 'matched_keyword').nlargest(top_n).index.tolist()
     df_top = df[df['matched_keyword'].isin(top_keywords)]
 
     trend_df = (
-        df_top.groupby([df_top['post_upload_date'].dt.date, 'matched_keyword'])
-        .size()
-        .reset_index(name='post_count')
-        .rename(columns={'post_upload_date': 'date'})
+        df_top.groupby(['date', 'matched_keyword'], observed=True)['post_count']
+        .sum()
+        .reset_index()
     )
 
     return trend_df
@@ -311,67 +226,61 @@ def get_top_sub_theme_trends(df, top_n=3):
 
 
 def get_fastest_growing_sub_themes(df, top_n=3):
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date', 'matched_keyword'])
-
     grouped = (
-        df.groupby([df['post_upload_date'].dt.date, 'matched_keyword'])
-        .size()
+        df.groupby(['date', 'matched_keyword'], observed=True)['post_count']
+        .sum()
         .reset_index(name='daily_post_count')
-        .rename(columns={'post_upload_date': 'date'})
     )
 
     grouped = grouped.sort_values(by=['matched_keyword', 'date'])
-    grouped['cumulative_post_count'] = grouped.groupby('matched_keyword')['daily_post_count'].cumsum()
-
-    growth_rates = []
-    for keyword, group in grouped.groupby('matched_keyword'):
-        if len(group) >= 2:
-            days = np.arange(len(group))
-            values = group['cumulative_post_count'].values
-            slope = np.polyfit(days, values, 1)[0]
-            growth_rates.append((keyword, slope))
-
-    fastest = sorted(growth_rates, key=lambda x: x[1], reverse=True)[:top_n]
-    top_keywords = [k[0] for k in fastest]
+    grouped['cumulative_post_count'] = grouped.groupby('matched_keyword', observed=True)['daily_post_count'].cumsum()
+
+    top_keywords = fastest_growing_groups(grouped, 'matched_keyword', top_n=top_n)
     result = grouped[grouped['matched_keyword'].isin(top_keywords)]
 
     return result
 
 
 def get_top_growing_sub_themes_per_year(df, top_n=3, last_n_years=5):
-    from datetime import datetime
-
-    df['post_upload_date'] = pd.to_datetime(df['post_upload_date'], errors='coerce')
-    df = df.dropna(subset=['post_upload_date', 'matched_keyword'])
-
-    df['year'] = df['post_upload_date'].dt.year
     current_year = datetime.now().year
     recent_years = list(range(current_year - last_n_years + 1, current_year + 1))
-    df = df[df['year'].isin(recent_years)]
-
-    results = []
-
-    for year in recent_years:
-        yearly_df = df[df['year'] == year]
-
-        grouped = (
-            yearly_df.groupby([yearly_df['post_upload_date'].dt.date, 'matched_keyword'])
-            .size()
-            .reset_index(name='daily_post_count')
-            .sort_values(by=['matched_keyword', 'post_upload_date'])
-        )
-        grouped['cumulative_post_count'] = grouped.groupby('matched_keyword')['daily_post_count'].cumsum()
+    return top_growth_per_year(df, 'matched_keyword', recent_years, top_n=top_n, count='post_count')
 
-        growth = grouped.groupby('matched_keyword')['cumulative_post_count'].agg(['first', 'last']).reset_index()
-        growth['growth'] = growth['last'] - growth['first']
-        top_keywords = growth.nlargest(top_n, 'growth')
 
-        for _, row in top_keywords.iterrows():
-            results.append({
-                'year': year,
-                'matched_keyword': row['matched_keyword'],
-                'growth': row['growth']
-            })
-
-    return pd.DataFrame(results)
+def page_results(df, posts=None, section=None):
+    """
+    The KPIs of the Consumer Led Analysis page (section
+    None), computed from one filtered rollup and, for distinct accounts, the
+    matching posts; or the chart inputs of one of its SECTIONS, which only
+    need the rollup. Sections are computed separately so that only the one
+    on screen has to be.
+    """
+    if section is None:
+        return {
+            'total_countries': get_total_countries(df),
+            'total_unique_accounts': get_total_unique_accounts(posts),
+            'total_volume': get_total_volume(df),
+            'total_engagement': get_total_engagement(df),
+            'average_post_engagement': get_average_post_engagement(df),
+        }
+    if section == 'Overall':
+        return {
+            'yearly_post_trend': get_yearly_post_trend(df),
+            'post_trends_over_time': get_post_trends_over_time(df),
+            'engagement_trends_over_time': get_engagement_trends_over_time(df),
+        }
+    if section == 'Theme':
+        return {
+            'top_themes': get_top_themes(df),
+            'theme_distribution': get_theme_distribution(df),
+            'top_theme_trends': get_top_theme_trends(df),
+            'fastest_growing_themes': get_fastest_growing_themes(df),
+            'top_growing_themes_per_year': get_top_growing_themes_per_year(df),
+        }
+    return {
+        'top_sub_themes': get_top_sub_themes(df),
+        'sub_theme_distribution': get_sub_theme_distribution(df),
+        'top_sub_theme_trends': get_top_sub_theme_trends(df),
+        'fastest_growing_sub_themes': get_fastest_growing_sub_themes(df),
+        'top_growing_sub_themes_per_year': get_top_growing_sub_themes_per_year(df),
+    }
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+
+ENGAGEMENT_COLUMNS = ['post_likes', 'post_video_view_count', 'post_comments']
+COUNT_COLUMNS = ENGAGEMENT_COLUMNS + ['followers']
+# Low-cardinality text columns, held as categoricals so filters and groupbys run on integer codes
+CATEGORY_COLUMNS = ['theme', 'matched_theme', 'matched_keyword', 'country', 'username']
+
+# Bytes at the end of a file hashed into its fingerprint
+FINGERPRINT_TAIL_BYTES = 64 * 1024
+
+# load_once state: (path, build) -> {'lock', 'version', 'value'}
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def downcast_count(series):
+    """Fills nulls with 0 and stores the counter in the smallest integer type that holds it."""
+    values = series.fillna(0)
+    if values.dtype.kind == 'f':
+        if not np.all(np.mod(values.to_numpy(), 1) == 0):
+            return values
+        values = values.astype('int64')
+    return pd.to_numeric(values, downcast='integer')
+
+
+def prepare_posts(df):
+    """
+    Fixes the schema of a raw posts export once, at load time:
+
+    - post_upload_date parsed to datetime64 (rows without a valid date are
+      dropped; every page filters them out through its date range anyway)
+    - date (day), month (first day of the month) and year derived from it
+    - like/view/comment/follower counters null-filled and downcast
+    - engagement = likes + views + comments
+    - theme/keyword/country/username columns stored as categoricals
+    - rows sorted by post_upload_date, so date ranges are slices (date_bounds)
+      and days are contiguous runs of rows (day_offsets)
+
+    The analytics helpers read these columns instead of re-parsing dates or
+    writing into the frame they are given.
+    """
+    dates = pd.to_datetime(df['post_upload_date'], errors='coerce')
+    df = df.assign(post_upload_date=dates).loc[dates.notna()]
+    df = df.sort_values('post_upload_date', kind='stable')
+
+    df['date'] = df['post_upload_date'].dt.normalize()
+    df['month'] = df['post_upload_date'].to_numpy().astype('datetime64[M]').astype('datetime64[ns]')
+    df['year'] = df['post_upload_date'].dt.year.astype('int16')
+
+    for column in COUNT_COLUMNS:
+        if column in df:
+            df[column] = downcast_count(df[column])
+
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            if not isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype('category')
+            # Parquet dictionaries come in first-seen order; sorted categories
+            # keep sorted groupbys and tie-breaks alphabetical
+            df[column] = df[column].cat.reorder_categories(sorted(df[column].cat.categories))
+
+    engagement = sum(df[column].astype('int64') for column in ENGAGEMENT_COLUMNS)
+    df['engagement'] = pd.to_numeric(engagement, downcast='integer')
+    return df.reset_index(drop=True)
+
+
+def date_bounds(df, start=None, end=None, column='post_upload_date'):
+    """
+    Row positions [lo, hi) of a frame sorted by `column` whose value lies in
+    [start, end] (an open end when None), found by binary search.
+    """
+    dates = df[column]
+    lo = 0 if start is None else int(dates.searchsorted(pd.Timestamp(start), side='left'))
+    hi = len(dates) if end is None else int(dates.searchsorted(pd.Timestamp(end), side='right'))
+    return lo, max(lo, hi)
+
+
+def date_slice(df, start=None, end=None, column='post_upload_date'):
+    """The rows of a frame sorted by `column` dated within [start, end], as a slice rather than a mask."""
+    lo, hi = date_bounds(df, start, end, column)
+    return df.iloc[lo:hi]
+
+
+def day_offsets(df):
+    """
+    Per-day offset table of a date-sorted frame: the distinct days, and the
+    row position each day starts at followed by len(df).
+    """
+    dates = df['date'].to_numpy()
+    if not len(dates):
+        return dates, np.zeros(1, dtype=np.intp)
+    starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+    return dates[starts], np.append(starts, len(dates))
+
+
+def daily_sum(df, values=None):
+    """
+    Post count per day of a date-sorted frame or, given `values` aligned
+    with its rows, their sum per day, as a Series indexed by date. Reads the
+    day boundaries off day_offsets instead of hashing every row.
+    """
+    days, offsets = day_offsets(df)
+    if values is None:
+        totals = np.diff(offsets)
+    else:
+        values = np.asarray(values)
+        # Accumulate in 64 bits; the counters are stored downcast
+        dtype = np.result_type(values.dtype, np.int64)
+        totals = np.add.reduceat(values, offsets[:-1], dtype=dtype) if len(days) else np.zeros(0, dtype=dtype)
+    return pd.Series(totals, index=pd.Index(days, name='date'))
+
+
+def file_fingerprint(path):
+    """
+    Version of a data file for cache keys: its size, modification time and
+    a hash of its tail (for parquet, the footer with the row group metadata
+    and statistics), so a rewrite is noticed even if it keeps size and mtime.
+    """
+    stat = os.stat(path)
+    with open(path, 'rb') as f:
+        f.seek(max(0, stat.st_size - FINGERPRINT_TAIL_BYTES))
+        tail = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, tail)
+
+
+def load_once(path, build):
+    """
+    build(path, version), run on first use and then shared by every caller
+    and session of the process; rebuilt when the file's fingerprint changes.
+    `path` may also be a tuple of paths, versioned by all their fingerprints.
+    Concurrent first calls wait for a single build.
+    """
+    if isinstance(path, tuple):
+        version = tuple(file_fingerprint(p) for p in path)
+    else:
+        version = file_fingerprint(path)
+    with _loaded_lock:
+        entry = _loaded.setdefault((path, build), {'lock': threading.Lock(), 'version': None, 'value': None})
+    with entry['lock']:
+        if entry['version'] != version:
+            entry['value'] = build(path, version)
+            entry['version'] = version
+        return entry['value']
+
+
+def read_columns(path, columns):
+    """The subset of `columns` present in a parquet file, in the requested order."""
+    available = set(pq.read_schema(path).names)
+    return [column for column in columns if column in available]
+
+
+def load_posts(path, columns=None):
+    """
+    Reads a posts export with the CATEGORY_COLUMNS dictionary-encoded by
+    pyarrow, so they arrive as categoricals without ever being materialized
+    as Python strings, and prepares it. Only `columns` are read from the
+    file when given; optional ones missing from the export are skipped.
+    """
+    if columns is not None:
+        columns = read_columns(path, columns)
+    return prepare_posts(pd.read_parquet(path, columns=columns, read_dictionary=CATEGORY_COLUMNS))
+
@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+
+from dataset import date_bounds
+
+
+# A packed bitmap costs one bit per row, a row list 4 bytes per matching row:
+# values held by more than 1/32 of the rows get a bitmap, the rest a row list
+DENSE_FRACTION = 1 / 32
+
+
+def build_filter_index(df, columns):
+    """
+    Inverted index from every value of the categorical `columns` to the rows
+    holding it. Frequent values get a packed row bitmap (np.packbits), rare
+    ones a sorted array of row positions, whichever is smaller. Built once
+    per loaded frame; select_rows resolves any combination of multiselect
+    choices against it. Rows with a null value never match.
+    """
+    size = len(df)
+    facets = {}
+    for column in columns:
+        categories = df[column].cat.categories
+        codes = df[column].cat.codes.to_numpy()
+        order = np.argsort(codes, kind='stable').astype(np.uint32)
+        # Null codes (-1) sort first and fall before the first boundary
+        bounds = np.searchsorted(codes[order], np.arange(len(categories) + 1))
+
+        bitmaps, rows = {}, {}
+        for code, value in enumerate(categories):
+            positions = order[bounds[code]:bounds[code + 1]]
+            if len(positions) > size * DENSE_FRACTION:
+                mask = np.zeros(size, dtype=bool)
+                mask[positions] = True
+                bitmaps[value] = np.packbits(mask)
+            else:
+                rows[value] = positions
+        facets[column] = {'bitmaps': bitmaps, 'rows': rows}
+    return {'size': size, 'facets': facets}
+
+
+def _facet_rows(facet, values):
+    """
+    Rows holding any of `values` in one facet, as (is_bitmap, rows): a packed
+    bitmap when a frequent value is selected, sorted row positions otherwise.
+    """
+    bitmaps = [facet['bitmaps'][value] for value in values if value in facet['bitmaps']]
+    rows = [facet['rows'][value] for value in values if value in facet['rows']]
+    if not bitmaps:
+        # Each row holds one value per facet, so the row lists are disjoint
+        return False, np.sort(np.concatenate(rows)) if rows else np.empty(0, dtype=np.uint32)
+
+    bitmap = np.bitwise_or.reduce(bitmaps)
+    if rows:
+        positions = np.concatenate(rows)
+        np.bitwise_or.at(bitmap, positions >> 3, (0x80 >> (positions & 7)).astype(np.uint8))
+    return True, bitmap
+
+
+def select_rows(index, selections, bounds=None):
+    """
+    Sorted positions of the rows matching every non-empty {column: values}
+    selection (any value within a column, all columns together), or None
+    when nothing is selected. Row lists are intersected first, smallest
+    first, and probed against the bitmaps; only bitmap-only selections are
+    combined a whole bitmap at a time. `bounds` = (lo, hi) further keeps
+    only positions in [lo, hi), e.g. a date range of a date-sorted frame.
+    """
+    bitmaps, row_lists = [], []
+    for column, values in selections.items():
+        if values:
+            is_bitmap, rows = _facet_rows(index['facets'][column], values)
+            (bitmaps if is_bitmap else row_lists).append(rows)
+
+    if not bitmaps and not row_lists:
+        return None
+
+    lo, hi = (0, index['size']) if bounds is None else bounds
+
+    if row_lists:
+        row_lists.sort(key=len)
+        rows = row_lists[0]
+        rows = rows[rows.searchsorted(lo):rows.searchsorted(hi)]
+        for other in row_lists[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        for bitmap in bitmaps:
+            rows = rows[(bitmap[rows >> 3] & (0x80 >> (rows & 7))) != 0]
+        return rows.astype(np.intp)
+
+    # Only the bytes covering [lo, hi) are combined and unpacked
+    first, last = lo >> 3, (hi + 7) >> 3
+    bitmap = np.bitwise_and.reduce([bitmap[first:last] for bitmap in bitmaps])
+    rows = np.flatnonzero(np.unpackbits(bitmap)) + (first << 3)
+    return rows[rows.searchsorted(lo):rows.searchsorted(hi)]
+
+
+def filter_frame(df, index, selections, start, end, date_column='post_upload_date'):
+    """
+    The rows of a date-sorted frame matching `selections` through its
+    filter index and dated within [start, end]; a plain slice when nothing
+    is selected.
+    """
+    bounds = date_bounds(df, start, end, date_column)
+    rows = select_rows(index, selections, bounds)
+    return df.iloc[slice(*bounds)] if rows is None else df.take(rows)
+
+
+def sort_composite(df, keys, date_column):
+    """
+    A frame sorted by its categorical `keys` (by category code, nulls last)
+    and then by `date_column` (missing dates last), as build_composite_index
+    expects.
+    """
+    return df.sort_values(keys + [date_column], kind='stable', na_position='last').reset_index(drop=True)
+
+
+def build_composite_index(df, keys, date_column):
+    """
+    Composite index of a sort_composite frame: each combination of `keys`
+    present is one block of contiguous rows, dated in order. Rows get a
+    block number and the rank of their date among the distinct dates
+    (missing dates rank last), combined into one sorted int64 per row.
+    composite_ranges resolves any selection of key values plus a date range
+    to one row range per matching block by binary search on it.
+    """
+    codes = {key: df[key].cat.codes.to_numpy() for key in keys}
+    size = len(df)
+    changed = np.zeros(max(size - 1, 0), dtype=bool)
+    for key in keys:
+        changed |= codes[key][1:] != codes[key][:-1]
+    starts = np.flatnonzero(np.r_[size > 0, changed])
+
+    dates = df[date_column]
+    distinct = pd.DatetimeIndex(dates.dropna().unique()).sort_values()
+    rank = distinct.get_indexer(dates)
+    rank[rank < 0] = len(distinct)
+    block = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, size)))
+    return {
+        'keys': keys,
+        'categories': {key: df[key].cat.categories for key in keys},
+        'codes': {key: codes[key][starts] for key in keys},
+        'starts': np.append(starts, size),
+        'dates': distinct,
+        'position': block.astype(np.int64) * (len(distinct) + 1) + rank,
+    }
+
+
+def composite_ranges(index, selections, start=None, end=None):
+    """
+    Row ranges (lo, hi arrays) of the blocks matching every non-empty
+    {key: values} selection, narrowed to rows dated within [start, end];
+    without a date range, whole blocks including undated rows. Ranges that
+    touch are merged, so an unfiltered frame is one range.
+    """
+    matching = np.ones(len(index['starts']) - 1, dtype=bool)
+    for key, values in selections.items():
+        if values:
+            wanted = index['categories'][key].get_indexer(list(values))
+            matching &= np.isin(index['codes'][key], wanted[wanted >= 0])
+    blocks = np.flatnonzero(matching)
+
+    if start is None and end is None:
+        lo, hi = index['starts'][blocks], index['starts'][blocks + 1]
+    else:
+        # Date ranks bounding [start, end]; each block's rows are ranked in order
+        first = 0 if start is None else index['dates'].searchsorted(pd.Timestamp(start), side='left')
+        last = len(index['dates']) if end is None else index['dates'].searchsorted(pd.Timestamp(end), side='right')
+        base = blocks.astype(np.int64) * (len(index['dates']) + 1)
+        lo = index['position'].searchsorted(base + first, side='left')
+        hi = index['position'].searchsorted(base + max(first, last), side='left')
+
+    keep = hi > lo
+    lo, hi = lo[keep], hi[keep]
+    if len(lo) > 1:
+        # A range starting where the previous one ends continues it
+        new = np.r_[True, lo[1:] != hi[:-1]]
+        lo, hi = lo[new], hi[np.r_[new[1:], True]]
+    return lo, hi
+
+
+def composite_frame(df, index, selections, start=None, end=None):
+    """
+    The rows of a sort_composite frame matching `selections` and dated
+    within [start, end] through its composite index: a slice of the frame
+    when they form one range, otherwise the ranges gathered in one take.
+    """
+    lo, hi = composite_ranges(index, selections, start, end)
+    if len(lo) == 1:
+        return df.iloc[lo[0]:hi[0]]
+    lengths = hi - lo
+    positions = np.repeat(lo - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return df.take(positions)
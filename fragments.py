@@ -0,0 +1,96 @@
+import threading
+import time
+from functools import wraps
+
+import streamlit as st
+from streamlit.logger import get_logger
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from result_cache import result_cache
+
+
+logger = get_logger(__name__)
+
+# Run timings per fragment: {name: {'page' | 'rerun': {'runs', 'total_seconds', 'last_seconds', 'max_seconds'}}}
+_timings = {}
+_timings_lock = threading.Lock()
+
+
+def _record(name, kind, seconds):
+    with _timings_lock:
+        entry = _timings.setdefault(name, {}).setdefault(
+            kind, {'runs': 0, 'total_seconds': 0.0, 'last_seconds': 0.0, 'max_seconds': 0.0}
+        )
+        entry['runs'] += 1
+        entry['total_seconds'] += seconds
+        entry['last_seconds'] = seconds
+        entry['max_seconds'] = max(entry['max_seconds'], seconds)
+    logger.debug("fragment %s: %.1f ms (%s)", name, seconds * 1000, kind)
+
+
+def timed_fragment(func):
+    """
+    st.fragment that records how long each of its runs takes under the
+    function's qualified name. A widget inside a fragment reruns only that
+    fragment (and the fragments nested in it), with the arguments of its
+    last run; those runs are timed as 'rerun', the latency of the
+    interaction, apart from 'page' runs as part of a whole script run.
+    Timings are logged at debug level and read with fragment_timings().
+    The pages are such fragments, so their filters rerun them without the
+    navbar and page picker.
+    """
+    name = func.__qualname__.replace('.<locals>', '')
+
+    @wraps(func)
+    def run(*args, **kwargs):
+        ctx = get_script_run_ctx()
+        kind = 'rerun' if ctx is not None and ctx.fragment_ids_this_run else 'page'
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _record(name, kind, time.perf_counter() - start)
+
+    return st.fragment(run)
+
+
+def fragment_timings():
+    """Copy of the run timings of every fragment of the process, by name and kind of run."""
+    with _timings_lock:
+        return {name: {kind: dict(entry) for kind, entry in kinds.items()} for name, kinds in _timings.items()}
+
+
+def page_computation(page, version, filters, compute):
+    """
+    computation(section) for the aggregates of a page: the result_cache key and
+    compute(section) of one section, or of what every section shares (section
+    None), such as the KPIs above them. Aggregates are shared across sessions, keyed by the data
+    version, the page, its normalized filters and the section.
+    """
+    def computation(section=None):
+        return (version, page, filters, section), lambda: compute(section)
+
+    return computation
+
+
+def sections_fragment(key, sections, computation):
+    """
+    Decorator turning draw(section, results) into the section picker of a page
+    and the charts of the selected section, as one timed_fragment: switching
+    sections reruns it alone. Only the selected section is computed and drawn
+    (results is None for Ask SixthAI); the other sections' aggregates are
+    prefetched in the background once it is on screen.
+    """
+    def decorate(draw):
+        @wraps(draw)
+        def run():
+            section = st.radio(
+                "Section", sections + ["Ask SixthAI"], horizontal=True, key=key, label_visibility="collapsed"
+            )
+            results = result_cache.get_or_compute(*computation(section)) if section in sections else None
+            draw(section, results)
+            result_cache.prefetch([computation(other) for other in sections if other != section])
+
+        return timed_fragment(run)
+
+    return decorate
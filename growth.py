@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+
+def linear_fit_from_sums(n, sum_x, sum_y, sum_xx, sum_xy, sum_yy):
+    """
+    Least-squares slope, intercept and R² for many groups at once, given
+    each group's point count and segment sums. Groups with fewer than two
+    points or no spread in x get NaN.
+    """
+    n = np.asarray(n, dtype='float64')
+    sum_x = np.asarray(sum_x, dtype='float64')
+    sum_y = np.asarray(sum_y, dtype='float64')
+
+    var_x = n * np.asarray(sum_xx, dtype='float64') - sum_x ** 2
+    var_y = n * np.asarray(sum_yy, dtype='float64') - sum_y ** 2
+    cov_xy = n * np.asarray(sum_xy, dtype='float64') - sum_x * sum_y
+
+    valid = (n >= 2) & (var_x > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(valid, cov_xy / var_x, np.nan)
+        intercept = np.where(valid, (sum_y - slope * sum_x) / n, np.nan)
+        # A flat series is fitted exactly by a flat line
+        r_squared = np.where(var_y > 0, cov_xy ** 2 / (var_x * var_y), 1.0)
+        r_squared = np.where(valid, np.clip(r_squared, 0.0, 1.0), np.nan)
+    return slope, intercept, r_squared
+
+
+def grouped_linear_fit(keys, x, y):
+    """
+    Fits y = slope * x + intercept separately for every key in one groupby
+    pass over the segment sums. Returns a frame indexed by key (sorted) with
+    n, slope, intercept and r_squared columns.
+    """
+    # Group by the bare values so a Series' index is never aligned against
+    keys = pd.Index(keys)
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    sums = (
+        pd.DataFrame({'n': 1.0, 'x': x, 'y': y, 'xx': x * x, 'xy': x * y, 'yy': y * y})
+        .groupby(keys, sort=True, observed=True)
+        .sum()
+    )
+    slope, intercept, r_squared = linear_fit_from_sums(
+        sums['n'], sums['x'], sums['y'], sums['xx'], sums['xy'], sums['yy']
+    )
+    return pd.DataFrame(
+        {'n': sums['n'].astype('int64'), 'slope': slope, 'intercept': intercept, 'r_squared': r_squared},
+        index=sums.index,
+    )
+
+
+def fastest_growing_groups(grouped, column, value='cumulative_post_count', top_n=3):
+    """
+    Ranks the groups of a (column, date)-sorted daily frame by the slope of
+    `value` against the day index, and returns the top_n group keys.
+    Groups with a single day are skipped; ties keep key order.
+    """
+    days = grouped.groupby(column, sort=False, observed=True).cumcount()
+    fits = grouped_linear_fit(grouped[column], days, grouped[value])
+    fits = fits[fits['n'] >= 2]
+    fastest = fits.sort_values('slope', ascending=False, kind='mergesort').head(top_n)
+    return fastest.index.tolist()
+
+
+def top_growth_per_year(df, column, years, top_n=3, count=None):
+    """
+    Growth of each `column` value within each year, measured like the yearly
+    charts always have: the last minus the first value of its daily
+    cumulative post count. Expects the prepared `year` and `date` columns;
+    for pre-aggregated frames `count` names the column holding each row's
+    number of posts. Returns the top_n values per year (ties keep key order)
+    from a single grouped pass, whatever the number of years or keys.
+    """
+    df = df[df['year'].isin(years)]
+    grouped = df.groupby([df['year'].astype('int64'), column, 'date'], sort=True, observed=True)
+    daily = grouped.size() if count is None else grouped[count].sum()
+    per_year = daily.groupby(level=['year', column], sort=True, observed=True)
+    growth = (per_year.sum() - per_year.first()).rename('growth').reset_index()
+    top = (
+        growth
+        .sort_values(by=['year', 'growth'], ascending=[True, False], kind='mergesort')
+        .groupby('year')
+        .head(top_n)
+    )
+    return top.reset_index(drop=True)
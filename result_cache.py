@@ -0,0 +1,127 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+# Budget for cached page results across all sessions of the process
+MAX_BYTES = 256 * 1024 ** 2
+
+# Whether pages compute the results of their hidden sections in the background
+PREFETCH = True
+
+
+def size_of(value):
+    """Approximate memory footprint of a cached value, counting frames and their contents in full."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(size_of(k) + size_of(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(size_of(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def filter_key(selections, start, end):
+    """
+    Hashable form of a page's filters in which the order of the selected
+    values and the time of day of the date range do not matter.
+    """
+    return (
+        tuple(sorted((column, tuple(sorted(values))) for column, values in selections.items() if values)),
+        pd.Timestamp(start).date(),
+        pd.Timestamp(end).date(),
+    )
+
+
+class ResultCache:
+    """
+    LRU cache of computed page results, bounded by their approximate memory
+    footprint rather than by entry count, with hit/miss counters. One
+    instance is shared by every session of the process, so cached values
+    must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        size = size_of(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            # A result larger than the whole budget is not worth evicting everything for
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def get_or_compute(self, key, compute):
+        """
+        The cached value for `key`, or compute() stored under it. Computing
+        happens outside the lock; two sessions missing the same key at once
+        both compute it and the later one is kept.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def prefetch(self, computations):
+        """
+        Computes the (key, compute) pairs not cached yet one after the other
+        in a background thread, so results a session is likely to ask for
+        next are ready by then. Does nothing when PREFETCH is off. compute()
+        must not call Streamlit; it runs outside any script run.
+        """
+        if not PREFETCH:
+            return
+        with self._lock:
+            missing = [(key, compute) for key, compute in computations if key not in self._entries]
+        if not missing:
+            return
+
+        def run():
+            for key, compute in missing:
+                with self._lock:
+                    if key in self._entries:
+                        continue
+                self.put(key, compute())
+
+        threading.Thread(target=run, name='result-cache-prefetch', daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+# Process-wide cache shared by the Brand and Consumer pages and their figures
+result_cache = ResultCache()
@@ -0,0 +1,35 @@
+def build_rollup(df, dimensions):
+    """
+    Daily rollup cube of a prepared posts frame: one row per date and
+    combination of `dimensions`, holding post_count, engagement and (when
+    the export has it) followers summed over its posts. Rows are sorted by
+    date and carry the derived year, so the page filters, date slicing and
+    chart helpers apply to it as they did to the posts. Null dimension
+    values form their own groups, so totals match the posts exactly.
+    Distinct counts are only exact for the dimensions kept in the cube.
+    """
+    measures = {'post_count': ('date', 'size'), 'engagement': ('engagement', 'sum')}
+    if 'followers' in df:
+        measures['followers'] = ('followers', 'sum')
+
+    rollup = (
+        df.groupby(['date'] + dimensions, sort=True, observed=True, dropna=False)
+        .agg(**measures)
+        .reset_index()
+    )
+    for column in measures:
+        rollup[column] = rollup[column].astype('int64')
+    rollup['year'] = rollup['date'].dt.year.astype('int16')
+    return rollup
+
+
+def total_by(rollup, column, value='post_count'):
+    """
+    Sum of `value` per value of `column`, largest first; the rollup
+    counterpart of value_counts on the posts (ties keep category order).
+    """
+    return (
+        rollup.groupby(column, sort=True, observed=True)[value]
+        .sum()
+        .sort_values(ascending=False, kind='stable')
+    )
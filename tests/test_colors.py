@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+import colors
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """A fresh registry saved to a temporary file."""
+    path = tmp_path / "colors.json"
+    monkeypatch.setattr(colors, "COLORS_PATH", str(path))
+    monkeypatch.setattr(colors, "_registry", None)
+    return path
+
+
+def test_palette_is_distinct():
+    palette = colors.palette()
+    assert len(palette) == len(set(palette)) > 1000
+
+
+def test_names_get_distinct_colors(registry):
+    names = [f"keyword {i}" for i in range(900)]
+    colors.register_names("keyword", names)
+    keywords = colors.load_colors()["keyword"]
+    assert sorted(keywords) == sorted(names)
+    assert len(set(keywords.values())) == len(names)
+
+
+def test_colors_stay_when_names_are_added(registry):
+    colors.register_names("theme", ["Design", "Price"])
+    before = colors.load_colors()
+    # A name sorting before the others, as a new export may bring
+    colors.register_names("theme", ["Amenities", "Design", "Location"])
+    after = colors.load_colors()
+    assert {name: after["theme"][name] for name in before["theme"]} == before["theme"]
+    assert len(set(after["theme"].values())) == 4
+    # Maps handed out before are left as they were
+    assert sorted(before["theme"]) == ["Design", "Price"]
+
+
+def test_colors_are_shared_across_kinds_and_sources(registry):
+    colors.register_names("keyword", ["sea view", "pool"])
+    colors.register_names("keyword", ["pool", "gym"])
+    colors.register_names("brand", ["pool"])
+    registered = colors.load_colors()
+    assert sorted(registered["keyword"]) == ["gym", "pool", "sea view"]
+    assert sorted(registered["brand"]) == ["pool"]
+    assert registered["theme"] == {}
+
+
+def test_colors_persist_across_restarts(registry, monkeypatch):
+    colors.register_names("brand", ["brand b", "brand a"])
+    saved = colors.load_colors()
+    assert json.loads(registry.read_text())["brand"] == saved["brand"]
+
+    # A new process reads the saved colors and hands out the next free ones
+    monkeypatch.setattr(colors, "_registry", None)
+    colors.register_names("brand", ["brand c"])
+    restarted = colors.load_colors()["brand"]
+    assert {name: restarted[name] for name in saved["brand"]} == saved["brand"]
+    assert restarted["brand c"] not in saved["brand"].values()
+
+
+def test_unwritable_registry_keeps_colors_in_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(colors, "COLORS_PATH", str(tmp_path / "missing" / "colors.json"))
+    monkeypatch.setattr(colors, "_registry", None)
+    colors.register_names("theme", ["Design"])
+    assert list(colors.load_colors()["theme"]) == ["Design"]
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_index import (
+    DENSE_FRACTION, build_composite_index, build_filter_index, composite_frame, select_rows, sort_composite,
+)
+
+
+KEYS = ["theme", "country", "keyword"]
+FACETS = ["theme", "matched_keyword", "country", "username"]
+
+
+def trends_frame(rng, size=3000):
+    """A Google Trends-like frame with null keys and missing dates, prepared as trends_data does."""
+    values = {
+        "theme": ["Amenities", "Design", "Location", "Price"],
+        "country": ["Egypt", "Saudi Arabia", "UAE", "United Kingdom"],
+        "keyword": [f"keyword {i}" for i in range(40)],
+    }
+    df = pd.DataFrame({
+        key: pd.Series(rng.choice(options + [None], size, p=[0.95 / len(options)] * len(options) + [0.05]))
+        for key, options in values.items()
+    })
+    dates = pd.Series(pd.Timestamp("2021-01-01") + pd.to_timedelta(rng.integers(0, 900, size), unit="D"))
+    df["date"] = dates.mask(rng.random(size) < 0.03)
+    df["value"] = rng.integers(0, 101, size)
+    df["row"] = np.arange(size)
+    for key in KEYS:
+        df[key] = df[key].astype("category")
+        df[key] = df[key].cat.reorder_categories(sorted(df[key].cat.categories))
+    return sort_composite(df, KEYS, "date")
+
+
+def masked(df, selections, start, end):
+    """The filters as the page applied them before the composite index: chained == masks and a date mask."""
+    for key, values in selections.items():
+        if values:
+            df = df[df[key] == values[0]]
+    if start is not None:
+        df = df[(df["date"] >= start) & (df["date"] <= end)]
+    return df
+
+
+def random_filters(rng, df):
+    """Single-value selections as the page's selectboxes make, "All" (empty) included, and maybe a date range."""
+    selections = {}
+    for key in KEYS:
+        choice = rng.integers(0, 4)
+        if choice == 0:
+            selections[key] = []
+        elif choice == 1:
+            selections[key] = ["Atlantis"]
+        else:
+            selections[key] = [rng.choice(df[key].cat.categories)]
+    start = end = None
+    if rng.random() < 0.7:
+        start, end = sorted(pd.Timestamp("2020-11-01") + pd.to_timedelta(rng.integers(0, 1000, 2), unit="D"))
+    return selections, start, end
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_composite_frame_matches_masks(seed):
+    rng = np.random.default_rng(seed)
+    df = trends_frame(rng)
+    index = build_composite_index(df, KEYS, "date")
+    for _ in range(100):
+        selections, start, end = random_filters(rng, df)
+        expected = masked(df, selections, start, end)
+        result = composite_frame(df, index, selections, start, end)
+        assert sorted(result["row"]) == sorted(expected["row"]), (selections, start, end)
+
+
+def test_composite_frame_without_selection():
+    df = trends_frame(np.random.default_rng(7))
+    index = build_composite_index(df, KEYS, "date")
+    no_selection = {key: [] for key in KEYS}
+
+    # No filter at all: the whole frame, undated rows included
+    assert composite_frame(df, index, no_selection).equals(df)
+
+    # A date range alone cuts every block: many row ranges gathered in one take
+    start, end = pd.Timestamp("2021-06-01"), pd.Timestamp("2022-01-31")
+    result = composite_frame(df, index, no_selection, start, end)
+    expected = masked(df, no_selection, start, end)
+    assert result["row"].tolist() == expected["row"].tolist()
+    assert result["date"].notna().all()
+
+
+def test_composite_frame_unknown_value():
+    df = trends_frame(np.random.default_rng(8))
+    index = build_composite_index(df, KEYS, "date")
+    assert composite_frame(df, index, {"theme": ["Atlantis"], "country": [], "keyword": []}).empty
+
+
+def posts_frame(rng, size=20000):
+    """A posts-like frame: categorical facets with a few frequent values and many rare ones, and nulls."""
+    def facet(count):
+        weights = 1 / np.arange(1, count + 1)
+        values = rng.choice([f"value {i}" for i in range(count)], size, p=weights / weights.sum())
+        return pd.Series(values).mask(rng.random(size) < 0.05).astype("category")
+
+    df = pd.DataFrame({column: facet(count) for column, count in zip(FACETS, [6, 300, 8, 2000])})
+    df["post_upload_date"] = pd.Timestamp("2021-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 900, size)), unit="D")
+    return df
+
+
+def test_filter_index_has_both_forms():
+    df = posts_frame(np.random.default_rng(0))
+    facets = build_filter_index(df, FACETS)["facets"]
+    assert facets["matched_keyword"]["bitmaps"] and facets["matched_keyword"]["rows"]
+    for column in FACETS:
+        for value, bitmap in facets[column]["bitmaps"].items():
+            assert np.unpackbits(bitmap)[:len(df)].sum() > len(df) * DENSE_FRACTION
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_select_rows_matches_isin(seed):
+    rng = np.random.default_rng(seed)
+    df = posts_frame(rng)
+    index = build_filter_index(df, FACETS)
+    for _ in range(100):
+        selections = {}
+        for column in FACETS:
+            categories = df[column].cat.categories
+            count = rng.integers(0, 4)
+            # Frequent and rare values, so bitmaps, row lists and their mixes are all resolved
+            values = list(rng.choice(categories[:10], count)) + list(rng.choice(categories, rng.integers(0, 3)))
+            if rng.random() < 0.1:
+                values.append("unknown")
+            # A multiselect holds each value once
+            selections[column] = list(dict.fromkeys(values))
+        bounds = None
+        if rng.random() < 0.5:
+            bounds = tuple(sorted(rng.integers(0, len(df) + 1, 2)))
+
+        mask = np.ones(len(df), dtype=bool)
+        for column, values in selections.items():
+            if values:
+                mask &= df[column].isin(values).to_numpy()
+        if bounds is not None:
+            mask[:bounds[0]] = mask[bounds[1]:] = False
+
+        rows = select_rows(index, selections, bounds)
+        if not any(selections.values()):
+            assert rows is None
+        else:
+            assert rows.tolist() == np.flatnonzero(mask).tolist(), (selections, bounds)
+
+
+def test_select_rows_without_selection():
+    df = posts_frame(np.random.default_rng(4))
+    index = build_filter_index(df, FACETS)
+    assert select_rows(index, {column: [] for column in FACETS}) is None
+    assert select_rows(index, {"theme": ["unknown"]}).size == 0
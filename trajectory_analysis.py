@@ -2,25 +2,63 @@ import streamlit as st
 import polars as pl
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
 import plotly.express as px
 from datetime import datetime
 import math
+from dataset import load_once
+from growth import linear_fit_from_sums
+from charts import show_chart
+from colors import load_colors, register_names
+from fragments import timed_fragment
+
+# Columns read from each source; the exports carry many more
+DEVELOPER_COLUMNS = ['theme', 'matched_keyword', 'country', 'post_upload_date']
+TREND_COLUMNS = ['theme', 'keyword', 'country', 'date', 'value']
+CONSUMER_COLUMNS = ['matched_theme', 'matched_keyword', 'country', 'post_upload_date']
+
+# Trajectory sources, reduced to the columns above
+DEVELOPER_PATH = "realestate_developers-min.parquet"
+TREND_PATH = "realestate_google_trends-min.parquet"
+CONSUMER_PATH = "cla-realestate-min.parquet"
+
+# Line graph resolutions offered by the "Select Time Aggregation" radio, as polars windows
+RESOLUTIONS = {'1M': '1mo', '3M': '3mo', '6M': '6mo', '1Y': '1y'}
+
+# -----------------------------
+# Normalize country names
+# -----------------------------
+COUNTRY_MAPPING = {
+    "uae": "United Arab Emirates",
+    'uk': 'United Kingdom',
+    'egy': 'Egypt',
+    'aus': 'Australia',
+    'sg': 'Singapore',
+    'sgp': 'Singapore',
+    'ksa': 'Saudi Arabia'
+}
+
+
+def ensure_datetime(df, col_name):
+    if df.schema[col_name] in [pl.Datetime, pl.Datetime('ms'), pl.Datetime('us'), pl.Datetime('ns')]:
+        return df.with_columns(pl.col(col_name).cast(pl.Datetime('ns')))
+    else:
+        return df.with_columns(pl.col(col_name).str.to_datetime().cast(pl.Datetime('ns')))
+
+
+def normalize_country(df, column='country'):
+    return df.with_columns(
+        pl.col(column).str.to_lowercase().replace(COUNTRY_MAPPING, default=None)
+        .fill_null(pl.col(column).str.to_titlecase())
+        .alias(column)
+    )
 
-def trajectory_analysis():
-    # -----------------------------
-    # Load and Normalize Data
-    # -----------------------------
-    dev = pl.read_parquet("realestate_developers-min.parquet")
-    trend = pl.read_parquet("realestate_google_trends-min.parquet")
-    cla = pl.read_parquet("cla-realestate-min.parquet")
 
-    def ensure_datetime(df, col_name):
-        if df.schema[col_name] in [pl.Datetime, pl.Datetime('ms'), pl.Datetime('us'), pl.Datetime('ns')]:
-            return df.with_columns(pl.col(col_name).cast(pl.Datetime('ns')))
-        else:
-            return df.with_columns(pl.col(col_name).str.to_datetime().cast(pl.Datetime('ns')))
-    
+def _build_sources(paths, version):
+    dev_path, trend_path, cla_path = paths
+    dev = pl.read_parquet(dev_path, columns=DEVELOPER_COLUMNS)
+    trend = pl.read_parquet(trend_path, columns=TREND_COLUMNS)
+    cla = pl.read_parquet(cla_path, columns=CONSUMER_COLUMNS)
+
     dev = ensure_datetime(dev, 'post_upload_date')
     trend = ensure_datetime(trend, 'date')
     cla = ensure_datetime(cla, 'post_upload_date')
@@ -29,34 +67,14 @@ def trajectory_analysis():
     cla = cla.with_columns(pl.col('matched_keyword').alias('sub_theme'))
     trend = trend.with_columns(pl.col('keyword').alias('sub_theme'))
 
-    # -----------------------------
-    # Normalize country names
-    # -----------------------------
-    COUNTRY_MAPPING = {
-        "uae": "United Arab Emirates",
-        'uk': 'United Kingdom',
-        'egy': 'Egypt',
-        'aus': 'Australia',
-        'sg': 'Singapore',
-        'sgp': 'Singapore',
-        'ksa': 'Saudi Arabia'
-    }
-
-    def normalize_country(df, column='country'):
-        return df.with_columns(
-            pl.col(column).str.to_lowercase().replace(COUNTRY_MAPPING, default=None)
-            .fill_null(pl.col(column).str.to_titlecase())
-            .alias(column)
-        )
-
     dev = normalize_country(dev)
     trend = normalize_country(trend)
     cla = normalize_country(cla)
 
-    # -----------------------------
-    # Dropdowns
-    # -----------------------------
-    combined_countries = (
+    register_names('theme', pl.concat([dev['theme'], trend['theme'], cla['matched_theme'].alias('theme')]).drop_nulls())
+    register_names('keyword', pl.concat([dev['sub_theme'], trend['sub_theme'], cla['sub_theme']]).drop_nulls())
+
+    countries = (
         pl.concat([dev.select('country'), trend.select('country'), cla.select('country')])
         .drop_nulls()
         .with_columns(pl.col('country').str.to_titlecase())
@@ -64,176 +82,263 @@ def trajectory_analysis():
         .sort('country')
         .to_pandas()['country'].tolist()
     )
-
-    combined_themes = (
-        pl.concat([
-            dev.select(pl.col('theme').alias('theme')),
-            trend.select(pl.col('theme').alias('theme')),
-            cla.select(pl.col('matched_theme').alias('theme'))
+    return {'dev': dev, 'trend': trend, 'cla': cla, 'countries': countries}
+
+
+def load_sources():
+    """
+    The developer, Google Trends and consumer sources, read and normalized
+    once and shared by every rerun and session; rebuilt when any of the
+    three files changes.
+    """
+    return load_once((DEVELOPER_PATH, TREND_PATH, CONSUMER_PATH), _build_sources)
+
+
+def prepare_data(sources, use_sub_theme=False, by_country=False):
+    """
+    Normalized volume per theme (or theme and sub_theme) and date, averaged
+    over the three sources from 2021 on. With by_country, every country is
+    computed in the same grouped pass, under a leading country column: each
+    source is min-max normalized within its country, exactly as if it had
+    been filtered to that country first.
+    """
+    group_keys = ['theme', 'sub_theme'] if use_sub_theme else ['theme']
+    keys = (['country'] if by_country else []) + group_keys
+
+    trend_temp = sources['trend'].with_columns([
+        pl.col('theme').alias('theme'),
+        pl.col('keyword').alias('sub_theme')
+    ])
+
+    dev_temp = sources['dev'].with_columns([
+        pl.col('theme').alias('theme'),
+        pl.col('matched_keyword').alias('sub_theme')
+    ])
+
+    cla_temp = sources['cla'].with_columns([
+        pl.col('matched_theme').alias('theme'),
+        pl.col('matched_keyword').alias('sub_theme')
+    ])
+
+    trend_agg = (
+        trend_temp
+        .group_by(keys + ['date'])
+        .agg(pl.col('value').mean().alias('raw_volume'))
+        .with_columns([
+            pl.col('raw_volume').min().over(keys).alias('min_val'),
+            pl.col('raw_volume').max().over(keys).alias('max_val')
         ])
-        .drop_nulls()
-        .with_columns(pl.col('theme').str.to_titlecase())
-        .unique()
-        .sort('theme')
-        .to_pandas()['theme']
-        .tolist()
+        .with_columns([
+            (100 * (pl.col('raw_volume') - pl.col('min_val')) /
+             (pl.col('max_val') - pl.col('min_val') + 1e-6)).alias('volume'),
+            pl.lit('google').alias('source'),
+            pl.col('date').cast(pl.Datetime('ns')).alias('date')
+        ])
+        .select(keys + ['date', 'volume', 'source'])
     )
 
-    selected_country = st.selectbox(
-        "🌍 Select Country",
-        options=["All countries"] + combined_countries,
-        index=0
+    dev_agg = (
+        dev_temp
+        .with_columns(pl.col('post_upload_date').dt.truncate('1mo').alias('date'))
+        .group_by(keys + ['date'])
+        .agg(pl.len().alias('count'))
+        .with_columns([
+            pl.col('count').min().over(keys).alias('min_count'),
+            pl.col('count').max().over(keys).alias('max_count')
+        ])
+        .with_columns([
+            (100 * (pl.col('count') - pl.col('min_count')) /
+             (pl.col('max_count') - pl.col('min_count') + 1e-6)).alias('volume'),
+            pl.lit('developer').alias('source')
+        ])
+        .select(keys + ['date', 'volume', 'source'])
     )
 
-    # -----------------------------
-    # Helper Functions
-    # -----------------------------
-    def prepare_data(use_sub_theme=False, country=None):
-        group_keys = ['theme', 'sub_theme'] if use_sub_theme else ['theme']
+    cla_agg = (
+        cla_temp
+        .with_columns(pl.col('post_upload_date').dt.truncate('1mo').alias('date'))
+        .group_by(keys + ['date'])
+        .agg(pl.len().alias('count'))
+        .with_columns([
+            pl.col('count').min().over(keys).alias('min_count'),
+            pl.col('count').max().over(keys).alias('max_count')
+        ])
+        .with_columns([
+            (100 * (pl.col('count') - pl.col('min_count')) /
+             (pl.col('max_count') - pl.col('min_count') + 1e-6)).alias('volume'),
+            pl.lit('ugc').alias('source')
+        ])
+        .select(keys + ['date', 'volume', 'source'])
+    )
 
-        trend_temp = trend.clone()
-        dev_temp = dev.clone()
-        cla_temp = cla.clone()
+    all_sources = pl.concat([trend_agg, dev_agg, cla_agg])
+    all_sources = all_sources.filter(pl.col('date') >= datetime(2021, 1, 1))
 
-        if country is not None:
-            dev_temp = dev_temp.filter(pl.col('country') == country)
-            trend_temp = trend_temp.filter(pl.col('country') == country)
-            cla_temp = cla_temp.filter(pl.col('country') == country)
+    if all_sources.height == 0:
+        return pl.DataFrame(), group_keys
 
-        trend_temp = trend_temp.with_columns([
-            pl.col('theme').alias('theme'),
-            pl.col('keyword').alias('sub_theme')
+    avg_volume = (
+        all_sources
+        .group_by(keys + ['date'])
+        .agg(pl.col('volume').mean().alias('volume'))
+        .sort(['date'] + group_keys)
+    )
+    return avg_volume, group_keys
+
+
+def classify_themes(avg_volume, group_keys):
+    """
+    Mean volume, growth (least-squares slope of volume per day since the
+    group's first date) and fit quality (r_squared) of every group, from a
+    single polars aggregation of segment sums, then the median-quadrant
+    category. Groups with a null key or a single date are left out; rows
+    come sorted by group key.
+    """
+    if avg_volume.height == 0:
+        return pl.DataFrame()
+    x = pl.col('x')
+    y = pl.col('volume')
+    sums = (
+        avg_volume
+        .drop_nulls(group_keys)
+        .with_columns(
+            (pl.col('date') - pl.col('date').min().over(group_keys)).dt.total_days().cast(pl.Float64).alias('x')
+        )
+        .group_by(group_keys)
+        .agg([
+            pl.len().alias('n'),
+            y.mean().alias('volume'),
+            x.sum().alias('sum_x'),
+            y.sum().alias('sum_y'),
+            (x * x).sum().alias('sum_xx'),
+            (x * y).sum().alias('sum_xy'),
+            (y * y).sum().alias('sum_yy'),
         ])
+        .filter(pl.col('n') >= 2)
+        .sort(group_keys)
+    )
+    if sums.height == 0:
+        return pl.DataFrame()
+    growth, _, r_squared = linear_fit_from_sums(
+        *(sums[column].to_numpy() for column in ['n', 'sum_x', 'sum_y', 'sum_xx', 'sum_xy', 'sum_yy'])
+    )
+    df = (
+        sums
+        .with_columns([pl.Series('growth', growth), pl.Series('r_squared', r_squared)])
+        .select([group_keys[0], 'volume', 'growth'] + group_keys[1:] + ['r_squared'])
+    )
+    v_median = df.select(pl.col('volume').median()).item()
+    g_median = df.select(pl.col('growth').median()).item()
+    df = df.with_columns([
+        pl.when((pl.col('volume') >= v_median) & (pl.col('growth') >= g_median))
+        .then(pl.lit('High Volume + High Growth'))
+        .when(pl.col('volume') >= v_median)
+        .then(pl.lit('High Volume + Low Growth'))
+        .when(pl.col('growth') >= g_median)
+        .then(pl.lit('Low Volume + High Growth'))
+        .otherwise(pl.lit('Low Volume + Low Growth'))
+        .alias('category')
+    ])
+    return df
+
+
+def resample_volumes(avg_volume, key):
+    """
+    Mean volume per `key` over calendar windows of every resolution in
+    RESOLUTIONS (months, quarters, half-years, years), each window labelled
+    by its first day; windows without data are left out. Sorted by key and
+    date, ready to be plotted.
+    """
+    if avg_volume.height == 0:
+        return {freq: pl.DataFrame() for freq in RESOLUTIONS}
+    data = avg_volume.drop_nulls(key).sort('date')
+    return {
+        freq: (
+            data
+            .group_by_dynamic('date', every=every, group_by=key)
+            .agg(pl.col('volume').mean())
+            .sort([key, 'date'])
+        )
+        for freq, every in RESOLUTIONS.items()
+    }
 
-        dev_temp = dev_temp.with_columns([
-            pl.col('theme').alias('theme'),
-            pl.col('matched_keyword').alias('sub_theme')
-        ])
 
-        cla_temp = cla_temp.with_columns([
-            pl.col('matched_theme').alias('theme'),
-            pl.col('matched_keyword').alias('sub_theme')
-        ])
+def _trajectory(avg_volume, group_keys):
+    # The line graphs plot the top groups by their last key (theme or sub-theme)
+    return avg_volume, classify_themes(avg_volume, group_keys), resample_volumes(avg_volume, group_keys[-1])
 
-        trend_agg = (
-            trend_temp
-            .group_by(group_keys + ['date'])
-            .agg(pl.col('value').mean().alias('raw_volume'))
-            .with_columns([
-                pl.col('raw_volume').min().over(group_keys).alias('min_val'),
-                pl.col('raw_volume').max().over(group_keys).alias('max_val')
-            ])
-            .with_columns([
-                (100 * (pl.col('raw_volume') - pl.col('min_val')) /
-                 (pl.col('max_val') - pl.col('min_val') + 1e-6)).alias('volume'),
-                pl.lit('google').alias('source'),
-                pl.col('date').cast(pl.Datetime('ns')).alias('date')
-            ])
-            .select(group_keys + ['date', 'volume', 'source'])
-        )
 
-        dev_agg = (
-            dev_temp
-            .with_columns(pl.col('post_upload_date').dt.truncate('1mo').alias('date'))
-            .group_by(group_keys + ['date'])
-            .agg(pl.len().alias('count'))
-            .with_columns([
-                pl.col('count').min().over(group_keys).alias('min_count'),
-                pl.col('count').max().over(group_keys).alias('max_count')
-            ])
-            .with_columns([
-                (100 * (pl.col('count') - pl.col('min_count')) /
-                 (pl.col('max_count') - pl.col('min_count') + 1e-6)).alias('volume'),
-                pl.lit('developer').alias('source')
-            ])
-            .select(group_keys + ['date', 'volume', 'source'])
-        )
+def _build_trajectories(paths, version):
+    sources = load_sources()
+    trajectories = {}
+    for use_sub_theme in (False, True):
+        avg_volume, group_keys = prepare_data(sources, use_sub_theme=use_sub_theme)
+        trajectories[use_sub_theme, None] = _trajectory(avg_volume, group_keys)
 
-        cla_agg = (
-            cla_temp
-            .with_columns(pl.col('post_upload_date').dt.truncate('1mo').alias('date'))
-            .group_by(group_keys + ['date'])
-            .agg(pl.len().alias('count'))
-            .with_columns([
-                pl.col('count').min().over(group_keys).alias('min_count'),
-                pl.col('count').max().over(group_keys).alias('max_count')
-            ])
-            .with_columns([
-                (100 * (pl.col('count') - pl.col('min_count')) /
-                 (pl.col('max_count') - pl.col('min_count') + 1e-6)).alias('volume'),
-                pl.lit('ugc').alias('source')
-            ])
-            .select(group_keys + ['date', 'volume', 'source'])
+        by_country, _ = prepare_data(sources, use_sub_theme=use_sub_theme, by_country=True)
+        if by_country.height == 0:
+            continue
+        partitions = by_country.drop_nulls('country').partition_by(
+            'country', as_dict=True, include_key=False, maintain_order=True
         )
+        for (country,), avg_volume in partitions.items():
+            trajectories[use_sub_theme, country] = _trajectory(avg_volume, group_keys)
+    return trajectories
 
-        all_sources = pl.concat([trend_agg, dev_agg, cla_agg])
-        all_sources = all_sources.filter(pl.col('date') >= datetime(2021, 1, 1))
 
-        if all_sources.height == 0:
-            return pl.DataFrame(), group_keys
+def load_trajectories():
+    """
+    Normalized volumes, classifications and resampled line graph series for
+    both grouping levels, for "All countries" (None) and every country,
+    keyed by (use_sub_theme, country); computed once per version of the
+    sources.
+    """
+    return load_once((DEVELOPER_PATH, TREND_PATH, CONSUMER_PATH), _build_trajectories)
 
-        avg_volume = (
-            all_sources
-            .group_by(group_keys + ['date'])
-            .agg(pl.col('volume').mean().alias('volume'))
-            .sort(['date'] + group_keys)
-        )
-        return avg_volume, group_keys
-
-    def classify_themes(avg_volume, group_keys):
-        stats = []
-        avg_volume_pd = avg_volume.to_pandas()
-        for keys, group in avg_volume_pd.groupby(group_keys):
-            if not isinstance(keys, tuple):
-                keys = (keys,)
-            x = (group['date'] - group['date'].min()).dt.days.values.reshape(-1, 1)
-            y = group['volume'].values.reshape(-1, 1)
-            if len(x) < 2:
-                continue
-            reg = LinearRegression().fit(x, y)
-            entry = {group_keys[0]: keys[0], 'volume': float(y.mean()), 'growth': float(reg.coef_[0][0])}
-            if len(group_keys) > 1:
-                entry[group_keys[1]] = keys[1]
-            stats.append(entry)
-        if not stats:
-            return pl.DataFrame()
-        df = pl.DataFrame(stats)
-        v_median = df.select(pl.col('volume').median()).item()
-        g_median = df.select(pl.col('growth').median()).item()
-        df = df.with_columns([
-            pl.when((pl.col('volume') >= v_median) & (pl.col('growth') >= g_median))
-            .then(pl.lit('High Volume + High Growth'))
-            .when(pl.col('volume') >= v_median)
-            .then(pl.lit('High Volume + Low Growth'))
-            .when(pl.col('growth') >= g_median)
-            .then(pl.lit('Low Volume + High Growth'))
-            .otherwise(pl.lit('Low Volume + Low Growth'))
-            .alias('category')
-        ])
-        return df
 
-    def plot_time_series(avg_volume, top_df, group_keys, category, freq_option='1M'):
+def get_trajectory(use_sub_theme=False, country=None):
+    """
+    (avg_volume, stats, {resolution: series}) of one grouping level and
+    country, None meaning all countries.
+    """
+    empty = (pl.DataFrame(), pl.DataFrame(), {freq: pl.DataFrame() for freq in RESOLUTIONS})
+    return load_trajectories().get((use_sub_theme, country), empty)
+
+
+# The page and its graph pickers are nested fragments: a control reruns only what is below it
+@timed_fragment
+def trajectory_analysis():
+    # -----------------------------
+    # Load and Normalize Data (cached)
+    # -----------------------------
+    sources = load_sources()
+    colors = load_colors()
+
+    # -----------------------------
+    # Dropdowns
+    # -----------------------------
+    selected_country = st.selectbox(
+        "🌍 Select Country",
+        options=["All countries"] + sources['countries'],
+        index=0
+    )
+
+    # -----------------------------
+    # Helper Functions
+    # -----------------------------
+    def plot_time_series(series, top_df, group_keys, category, freq_option='1M'):
         key = group_keys[1] if len(group_keys) > 1 else group_keys[0]
         selected = top_df.filter(pl.col('category') == category).select(key).to_pandas()[key].tolist()
-        data = avg_volume.filter(pl.col(key).is_in(selected)).sort(['date', key]).to_pandas()
 
-        if data.empty:
-            return px.line(title=f"No data for {category}")
-
-        data['date'] = pd.to_datetime(data['date'])
-        data.set_index('date', inplace=True)
-        
-        # Resample data based on frequency
-        data_resampled = data.groupby([key]).resample(freq_option).mean(numeric_only=True).reset_index()
-        
-        # Remove any NaN values that might result from resampling
-        data_resampled = data_resampled.dropna(subset=['volume'])
-        
+        # Series are precomputed at every resolution; switching only re-renders
+        data = series[freq_option]
+        data_resampled = data.filter(pl.col(key).is_in(selected)).to_pandas() if data.height else pd.DataFrame()
         if data_resampled.empty:
-            return px.line(title=f"No data for {category} after resampling")
+            return px.line(title=f"No data for {category}")
 
         # Create the plot
-        fig = px.line(data_resampled, x='date', y='volume', color=key, title=f"{category} - Top 3 ({freq_option})")
+        fig = px.line(data_resampled, x='date', y='volume', color=key, title=f"{category} - Top 3 ({freq_option})",
+                      color_discrete_map=colors['theme' if key == 'theme' else 'keyword'])
         
         # Set x-axis tick frequency based on the selected frequency
         if freq_option == '1M':
@@ -299,22 +404,37 @@ def trajectory_analysis():
                 data = data.sort('volume', descending=True).head(5)
             data_pd = data.to_pandas()
             fig = px.bar(data_pd, x=key, y='normalized_volume', color=key,
-                         title=f"{category} - Normalized Volume", text='normalized_volume')
-            st.plotly_chart(fig, use_container_width=True)
+                         title=f"{category} - Normalized Volume", text='normalized_volume',
+                         color_discrete_map=colors['theme' if key == 'theme' else 'keyword'])
+            show_chart(fig)
+
+    @timed_fragment
+    def line_graphs(series, top_df, group_keys, categories, slug):
+        freq_option = st.radio(
+            "Select Time Aggregation",
+            options=["1M", "3M", "6M", "1Y"],
+            index=0,
+            horizontal=True,
+            key=f"freq_selector_{slug}"
+        )
+        for cat in categories:
+            show_chart(plot_time_series(series, top_df, group_keys, cat, freq_option))
 
+    @timed_fragment
     def show_tab(title, use_sub_theme=False, country=None):
-        avg_volume, group_keys = prepare_data(use_sub_theme=use_sub_theme, country=country)
+        group_keys = ['theme', 'sub_theme'] if use_sub_theme else ['theme']
+        # Switching country is a lookup into the precomputed results
+        avg_volume, stats_df, series = get_trajectory(use_sub_theme, country)
         if avg_volume.height == 0:
             st.warning(f"No data available for {title.lower()} in the selected scope.")
             return
-        stats_df = classify_themes(avg_volume, group_keys)
         if stats_df.height == 0:
             st.warning(f"Not enough data points for trend classification in {title.lower()}.")
             return
         top_df = (
             stats_df
             .with_row_index()
-            .sort(['category', 'volume'], descending=[False, True])
+            .sort(['category', 'volume'], descending=[False, True], maintain_order=True)
             .with_columns(pl.int_range(pl.len()).over('category').alias('rank'))
             .filter(pl.col('rank') < 3)
             .drop(['index', 'rank'])
@@ -323,19 +443,17 @@ def trajectory_analysis():
         display_cols = ['theme'] + (['sub_theme'] if use_sub_theme else []) + ['volume', 'growth', 'category']
         st.dataframe(stats_df.select(display_cols).to_pandas(), use_container_width=True)
 
-        line_graph, bar_graph = st.tabs(["Line Graphs", "Bar Graphs"])
-        with line_graph:
-            freq_option = st.radio(
-                "Select Time Aggregation",
-                options=["1M", "3M", "6M", "1Y"],
-                index=0,
-                horizontal=True,
-                key=f"freq_selector_{title.lower().replace(' ', '_')}"
-            )
-            for cat in stats_df.select('category').unique().to_pandas()['category']:
-                st.plotly_chart(plot_time_series(avg_volume, top_df, group_keys, cat, freq_option), use_container_width=True)
-
-        with bar_graph:
+        # Only the selected kind of graph is built
+        slug = title.lower().replace(' ', '_')
+        graphs = st.radio(
+            "Graphs", ["Line Graphs", "Bar Graphs"], horizontal=True,
+            key=f"graphs_{slug}", label_visibility="collapsed"
+        )
+        if graphs == "Line Graphs":
+            categories = stats_df.select('category').unique().to_pandas()['category']
+            line_graphs(series, top_df, group_keys, categories, slug)
+
+        else:
             plot_bar(stats_df, group_keys, use_top5=use_sub_theme)
 
     # -----------------------------
@@ -345,9 +463,8 @@ def trajectory_analysis():
 
     selected_country_param = None if selected_country == "All countries" else selected_country
 
-    theme_tab, sub_theme_tab = st.tabs(["Themes", "Sub-Themes"])
-    with theme_tab:
-        show_tab("Themes", use_sub_theme=False, country=selected_country_param)
-
-    with sub_theme_tab:
-        show_tab("Sub-Themes", use_sub_theme=True, country=selected_country_param)
+    # Only the selected grouping level is drawn; both are precomputed per country
+    section = st.radio(
+        "Grouping", ["Themes", "Sub-Themes"], horizontal=True, key="trajectory_section", label_visibility="collapsed"
+    )
+    show_tab(section, use_sub_theme=section == "Sub-Themes", country=selected_country_param)
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+from colors import register_names
+from dataset import load_once
+from filter_index import build_composite_index, sort_composite
+from growth import grouped_linear_fit
+
+
+# Columns used by the Search Trends page
+COLUMNS = ["theme", "keyword", "country", "date", "value"]
+
+DATA_PATH = "realestate_google_trends.parquet"
+
+# Filter columns of the page; the frame is sorted and indexed by them, then by date
+KEYS = ["theme", "country", "keyword"]
+
+# Chart sections of the page, in navigation order; each is computed only when shown
+SECTIONS = ["Theme", "Sub Theme"]
+
+
+def _build_data(path, version):
+    df = pd.read_parquet(path, columns=COLUMNS)
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    # Filter columns held as categoricals with sorted categories, so the page
+    # filters and aggregates on their integer codes
+    for column in KEYS:
+        df[column] = df[column].astype("category")
+        df[column] = df[column].cat.reorder_categories(sorted(df[column].cat.categories))
+    register_names("theme", df["theme"].cat.categories)
+    register_names("keyword", df["keyword"].cat.categories)
+    # Sorted by (theme, country, keyword, date), so any filter combination and
+    # date range is a set of contiguous row ranges
+    df = sort_composite(df, KEYS, "date")
+    return {'version': version, 'trends': df, 'index': build_composite_index(df, KEYS, "date")}
+
+
+def load_data():
+    """
+    The Google Trends frame and its composite index, loaded when the page is
+    first opened and shared by every session.
+    """
+    return load_once(DATA_PATH, _build_data)
+
+
+def aggregate_values(df):
+    """
+    Sum and count of `value` per (theme, keyword, date) of the filtered
+    rows: the one pass over them that every chart of the page is derived
+    from. Groups are numbered from the category codes and day numbers in a
+    single np.unique, and summed with np.bincount. Returns per-group code
+    arrays (-1 for null) with their sums and counts, and the values the
+    codes stand for.
+    """
+    themes = df["theme"].cat.categories
+    keywords = df["keyword"].cat.categories
+    day, dates = pd.factorize(df["date"], sort=True)
+    theme = df["theme"].cat.codes.to_numpy().astype("int64")
+    keyword = df["keyword"].cat.codes.to_numpy().astype("int64")
+
+    # Shifted by one so nulls (-1) get their own group
+    key = ((theme + 1) * (len(keywords) + 1) + keyword + 1) * (len(dates) + 1) + day + 1
+    groups, inverse = np.unique(key, return_inverse=True)
+    values = df["value"].to_numpy(dtype="float64")
+    present = ~np.isnan(values)
+
+    group_keyword, group_day = np.divmod(groups, len(dates) + 1)
+    group_theme, group_keyword = np.divmod(group_keyword, len(keywords) + 1)
+    return {
+        "theme": group_theme - 1,
+        "keyword": group_keyword - 1,
+        "date": group_day - 1,
+        "sum": np.bincount(inverse, weights=np.where(present, values, 0), minlength=len(groups)),
+        "count": np.bincount(inverse, weights=present, minlength=len(groups)),
+        "values": {"theme": themes, "keyword": keywords, "date": dates},
+    }
+
+
+def mean_by(sums, keys):
+    """
+    Mean value per `keys` from the aggregate_values sums, as a frame sorted
+    by keys; the same as a groupby mean over the rows, rows with a null key
+    left out. Themes and keywords come back as categoricals.
+    """
+    codes = [sums[key] for key in keys]
+    keep = np.logical_and.reduce([code >= 0 for code in codes])
+    sizes = [len(sums["values"][key]) for key in keys]
+    key = np.ravel_multi_index([code[keep] for code in codes], sizes)
+    groups, inverse = np.unique(key, return_inverse=True)
+    total = np.bincount(inverse, weights=sums["sum"][keep], minlength=len(groups))
+    count = np.bincount(inverse, weights=sums["count"][keep], minlength=len(groups))
+
+    columns = {}
+    for column, code in zip(keys, np.unravel_index(groups, sizes)):
+        values = sums["values"][column]
+        columns[column] = values[code] if column == "date" else pd.Categorical.from_codes(code, values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        columns["value"] = total / count
+    return pd.DataFrame(columns)
+
+
+def top_by_daily_mean(time_df, column, top_n=3):
+    """The top_n values of `column` by the mean of their daily means."""
+    means = time_df.groupby(column, as_index=False, observed=True)["value"].mean()
+    return means.sort_values("value", ascending=False).head(top_n)[column]
+
+
+def trend_frame(time_df, column, selected):
+    """The daily means of the `selected` values of `column`, sorted by date as the trend charts draw them."""
+    trend = time_df[time_df[column].isin(selected)]
+    return trend.sort_values(["date", column]).reset_index(drop=True)[["date", column, "value"]]
+
+
+def theme_results(sums):
+    # Themes by their mean over all rows, largest first (top 5 bar and pie)
+    theme_ranking = mean_by(sums, ["theme"]).sort_values("value", ascending=False, kind="stable")
+    theme_time = mean_by(sums, ["theme", "date"])
+
+    # Fastest growing: last daily mean minus the first
+    growth = theme_time.groupby("theme", observed=True)["value"].agg(["first", "last"])
+    growth = growth["last"] - growth["first"]
+    top_growers = growth.sort_values(ascending=False).head(3).index.tolist()
+
+    return {
+        'theme_ranking': theme_ranking,
+        'top_theme_trends': trend_frame(theme_time, "theme", top_by_daily_mean(theme_time, "theme")),
+        'fastest_growing_themes': theme_time[theme_time["theme"].isin(top_growers)],
+    }
+
+
+def keyword_results(sums):
+    # Keywords by their mean over all rows, largest first (top 5 bar and top N pie)
+    keyword_ranking = mean_by(sums, ["keyword"]).sort_values("value", ascending=False, kind="stable")
+    keyword_time = mean_by(sums, ["keyword", "date"])
+
+    # Slope (growth rate per day) of every keyword in one grouped least-squares pass
+    days = (keyword_time["date"] - keyword_time["date"].min()).dt.days
+    keyword_fits = grouped_linear_fit(keyword_time["keyword"], days, keyword_time["value"])
+    keyword_fits = keyword_fits[keyword_fits["n"] >= 2]  # Skip if not enough data points
+    # Top 3 keywords by slope (ties keep keyword order)
+    top_growers = keyword_fits["slope"].sort_values(ascending=False, kind="mergesort").head(3).index.tolist()
+
+    return {
+        'keyword_ranking': keyword_ranking,
+        'top_keyword_trends': trend_frame(keyword_time, "keyword", top_by_daily_mean(keyword_time, "keyword")),
+        'fastest_growing_keywords': keyword_time[keyword_time["keyword"].isin(top_growers)],
+    }
+
+
+def page_results(sums, section):
+    """
+    The chart inputs of one of the SECTIONS of the Search Trends page,
+    derived from the aggregate_values sums of the filtered rows, which
+    every section shares.
+    """
+    if section == "Theme":
+        return theme_results(sums)
+    if section == "Sub Theme":
+        return keyword_results(sums)
+    raise ValueError(f"Unknown section: {section}")